@@ -0,0 +1,112 @@
+import pickle
+from collections import OrderedDict, namedtuple
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+Entry = namedtuple('Entry', ('expires', 'version', 'payload'))
+
+
+def token_digest(key):
+    return sha256(key.encode()).hexdigest()
+
+
+def version_key(digest):
+    return f'auth_token_version:{digest}'
+
+
+def token_key(digest):
+    return f'auth_token:{digest}'
+
+
+def token_version(digest):
+    """
+    Версия снимка токена. Случайная, чтобы после вытеснения ключа
+    из кеша старые снимки не совпали с новой.
+    """
+    return cache.get_or_set(
+        version_key(digest), lambda: uuid4().hex, timeout=None)
+
+
+def invalidate_tokens(keys):
+    """Сброс снимков токенов во всех воркерах после коммита."""
+    keys = [version_key(token_digest(key)) for key in keys]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(list(Token.objects.filter(
+        user_id=user_id).values_list('key', flat=True)))
+
+
+class TokenCache:
+    """
+    LRU снимков токен -> пользователь в памяти воркера с TTL.
+    Снимок хранится сериализованным, чтобы запросы не делили один
+    объект пользователя.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry.expires < monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry
+
+    def set(self, digest, entry):
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к БД на каждый вызов. Снимок
+    токена с пользователем берётся из LRU воркера, затем из общего
+    кеша (TOKEN_CACHE_SHARED) и только потом из базы. Снимок годен,
+    пока не сброшена версия токена: её сбрасывают выход, удаление
+    токена и изменение пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        timeout = settings.TOKEN_CACHE_TIMEOUT
+        if not timeout:
+            return super().authenticate_credentials(key)
+        digest = token_digest(key)
+        version = token_version(digest)
+        entry = token_cache.get(digest)
+        if entry is None and settings.TOKEN_CACHE_SHARED:
+            entry = cache.get(token_key(digest))
+            if entry is not None:
+                entry = entry._replace(expires=monotonic() + timeout)
+                token_cache.set(digest, entry)
+        if entry is not None and entry.version == version:
+            return pickle.loads(entry.payload)
+        user, token = super().authenticate_credentials(key)
+        entry = Entry(monotonic() + timeout, version,
+                      pickle.dumps((user, token)))
+        token_cache.set(digest, entry)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(token_key(digest), entry, timeout=timeout)
+        return user, token
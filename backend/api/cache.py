@@ -0,0 +1,66 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+FEED_VERSION_KEY = 'recipes_feed_version'
+INGREDIENTS_VERSION_KEY = 'ingredients_version'
+TAGS_VERSION_KEY = 'tags_version'
+COOK_INDEX_VERSION_KEY = 'cook_index_version'
+FEED_PARAMS = ('page', 'limit', 'tags', 'author', 'ordering', 'search',
+               'cursor', 'pagination')
+
+
+def get_version(key):
+    """Текущая версия набора данных."""
+    return cache.get_or_set(key, 1, timeout=None)
+
+
+def bump_version(key):
+    """
+    Увеличение версии набора данных после изменений. Выполняется
+    после коммита, чтобы другие процессы не перечитали старые данные.
+    """
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_feed():
+    """
+    Сброс всех закешированных страниц ленты.
+    Старые ключи перестают использоваться и вытесняются по таймауту.
+    """
+    bump_version(FEED_VERSION_KEY)
+
+
+def feed_cache_key(request):
+    """
+    Ключ кеша для страницы ленты по нормализованным параметрам запроса.
+    Если в запросе есть посторонние параметры, страница не кешируется.
+    """
+    params = request.query_params
+    if set(params) - set(FEED_PARAMS):
+        return None
+    query = '&'.join(
+        f'{name}={",".join(sorted(params.getlist(name)))}'
+        for name in FEED_PARAMS if name in params
+    )
+    digest = md5(
+        f'{request.get_host()}:{request.headers.get("X-Pagination", "")}:'
+        f'{query}'.encode()
+    ).hexdigest()
+    return f'recipes_feed:{get_version(FEED_VERSION_KEY)}:{digest}'
+
+
+def get_cached_feed(key):
+    return cache.get(key)
+
+
+def set_cached_feed(key, data):
+    cache.set(key, data, timeout=settings.RECIPES_CACHE_TIMEOUT)
@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """Кеш общий для всех процессов, например Redis."""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHES
+
+
+@register()
+def cache_check(app_configs, **kwargs):
+    """Сбросы кешей в одном воркере не видны остальным без общего кеша."""
+    if int(os.getenv('WEB_CONCURRENCY', 1)) > 1 and not shared_cache():
+        return [Error(
+            'При нескольких воркерах нужен общий кеш.',
+            hint='CACHE_BACKEND=django_redis.cache.RedisCache и '
+                 'CACHE_LOCATION=redis://redis:6379/1',
+            id='api.E001',
+        )]
+    return []
+
+
+@register()
+def token_cache_check(app_configs, **kwargs):
+    """
+    Снимки токенов сбрасываются через кеш: с локальным кешем смена
+    пароля в другом процессе не доходит до воркера до конца TTL.
+    """
+    if settings.TOKEN_CACHE_TIMEOUT and not shared_cache():
+        return [Error(
+            'Кеш снимков токенов требует общего кеша.',
+            hint='TOKEN_CACHE_TIMEOUT=0 или CACHE_BACKEND='
+                 'django_redis.cache.RedisCache',
+            id='api.E002',
+        )]
+    return []
@@ -0,0 +1,29 @@
+from hashlib import md5
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def conditional_response(request, key, build_response, last_modified=None,
+                         max_age=None):
+    """
+    Ответ с ETag по ключу версии данных. Если клиент прислал
+    совпадающий If-None-Match, сериализация не выполняется
+    и возвращается 304.
+    """
+    etag = f'"{md5(key.encode()).hexdigest()}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build_response()
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if max_age is None:
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,198 @@
+import heapq
+from array import array
+from random import randrange
+from threading import Lock, local
+
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import IngredientsInRecipe
+
+from .cache import COOK_INDEX_VERSION_KEY
+from .replicas import primary
+
+# Сколько версий назад воркер догоняет по списку изменённых рецептов,
+# а не перечитывает индекс целиком.
+MAX_DELTAS = 100
+CHANGES_TIMEOUT = 24 * 60 * 60
+
+pending = local()
+
+
+def changes_key(version):
+    return f'cook_index_changes:{version}'
+
+
+def new_version():
+    """
+    Случайная начальная версия: после вытеснения ключа новые номера
+    не совпадут со списками изменений, оставшимися от старых.
+    """
+    return randrange(1, 1 << 48)
+
+
+def current_version():
+    return cache.get_or_set(COOK_INDEX_VERSION_KEY, new_version,
+                            timeout=None)
+
+
+def flush_pending():
+    recipe_ids = getattr(pending, 'ids', None)
+    if not recipe_ids:
+        return
+    pending.ids = set()
+    try:
+        version = cache.incr(COOK_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(COOK_INDEX_VERSION_KEY, new_version(), timeout=None)
+        return
+    cache.set(changes_key(version), sorted(recipe_ids),
+              timeout=CHANGES_TIMEOUT)
+
+
+class Matches:
+    """
+    Найденные рецепты для пагинатора: длина - число совпадений,
+    срез отбирает через heapq только нужную часть сверху.
+    """
+
+    def __init__(self, matched, recipes):
+        self._matched = matched
+        self._recipes = recipes
+
+    def __len__(self):
+        return len(self._matched)
+
+    def __iter__(self):
+        return iter(self[:len(self)])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(len(self))
+        top = heapq.nlargest(stop, (
+            (count / len(self._recipes[recipe_id]),
+             count - len(self._recipes[recipe_id]), recipe_id)
+            for recipe_id, count in self._matched.items()
+        ))
+        return [
+            (recipe_id, coverage, -missing)
+            for coverage, missing, recipe_id in top[start:]
+        ]
+
+
+class CookIndex:
+    """
+    Обратный индекс ингредиент -> рецепты в памяти воркера.
+    Для каждого ингредиента хранится компактный массив id рецептов,
+    для каждого рецепта - его ингредиенты. Изменение состава рецептов
+    меняет версию и записывает в кеш id изменённых рецептов: воркер
+    перечитывает только их, а целиком - если отстал или список вытеснен.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = ({}, {})
+
+    def _load(self, version):
+        postings = {}
+        recipes = {}
+        pairs = IngredientsInRecipe.objects.values_list(
+            'ingredient_id', 'recipe_id').distinct().order_by().iterator(
+            chunk_size=10000)
+        for ingredient_id, recipe_id in pairs:
+            postings.setdefault(ingredient_id, array('q')).append(recipe_id)
+            recipes.setdefault(recipe_id, []).append(ingredient_id)
+        self._data = (postings, {
+            recipe_id: tuple(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        })
+        self._version = version
+
+    def _changed_recipes(self, version):
+        """Id рецептов, изменённых после версии воркера, или None."""
+        if self._version is None or not (
+                0 < version - self._version <= MAX_DELTAS):
+            return None
+        keys = [changes_key(number)
+                for number in range(self._version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        return {recipe_id for ids in changes.values() for recipe_id in ids}
+
+    def _apply(self, version, recipe_ids):
+        """
+        Замена записей изменённых рецептов. Массивы и словари не
+        меняются на месте, а подменяются: поиск в других потоках
+        читает их без блокировки.
+        """
+        postings, recipes = self._data
+        fresh = {}
+        for ingredient_id, recipe_id in IngredientsInRecipe.objects.filter(
+                recipe_id__in=recipe_ids).values_list(
+                'ingredient_id', 'recipe_id').distinct().order_by():
+            fresh.setdefault(recipe_id, []).append(ingredient_id)
+        touched = {
+            ingredient_id
+            for recipe_id in recipe_ids
+            for ingredient_id in (*recipes.get(recipe_id, ()),
+                                  *fresh.get(recipe_id, ()))
+        }
+        postings = dict(postings)
+        for ingredient_id in touched:
+            posting = array('q', (
+                recipe_id for recipe_id in postings.get(ingredient_id, ())
+                if recipe_id not in recipe_ids))
+            posting.extend(
+                recipe_id for recipe_id in recipe_ids
+                if ingredient_id in fresh.get(recipe_id, ()))
+            if posting:
+                postings[ingredient_id] = posting
+            else:
+                postings.pop(ingredient_id, None)
+        recipes = {
+            recipe_id: ingredients for recipe_id, ingredients in
+            recipes.items() if recipe_id not in recipe_ids
+        }
+        recipes.update(
+            (recipe_id, tuple(ingredients))
+            for recipe_id, ingredients in fresh.items())
+        self._data = (postings, recipes)
+        self._version = version
+
+    def _actual(self):
+        version = current_version()
+        if version != self._version:
+            with self._lock, primary():
+                if version != self._version:
+                    recipe_ids = self._changed_recipes(version)
+                    if recipe_ids is None:
+                        self._load(version)
+                    else:
+                        self._apply(version, recipe_ids)
+        return self._data
+
+    def search(self, ingredient_ids):
+        """
+        Рецепты, в которых есть хотя бы один из ингредиентов:
+        (id рецепта, доля имеющихся ингредиентов, сколько не хватает),
+        сначала самые полные. Сортируется только запрошенный срез.
+        """
+        postings, recipes = self._actual()
+        matched = {}
+        for ingredient_id in set(ingredient_ids):
+            for recipe_id in postings.get(ingredient_id, ()):
+                matched[recipe_id] = matched.get(recipe_id, 0) + 1
+        return Matches(matched, recipes)
+
+    @staticmethod
+    def invalidate(recipe_ids):
+        """Состав рецептов изменён: воркеры перечитают их после коммита."""
+        if not hasattr(pending, 'ids'):
+            pending.ids = set()
+        pending.ids.update(recipe_ids)
+        transaction.on_commit(flush_pending)
+
+
+cook_index = CookIndex()
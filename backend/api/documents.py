@@ -0,0 +1,121 @@
+import logging
+from threading import local
+
+from django.db import DatabaseError, transaction
+from recipes.models import Recipe, RecipeDocument
+
+from .relations import get_relations
+from .replicas import primary
+from .serializers import CustomUserSerializer, RecipebrowseSerializer
+
+FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+logger = logging.getLogger(__name__)
+
+pending = local()
+
+
+def build(recipe_ids):
+    """
+    Документы рецептов в виде RecipebrowseSerializer без флагов
+    пользователя. Ссылки на изображения хранятся относительными.
+    """
+    recipes = Recipe.objects.filter(id__in=recipe_ids).select_related(
+        'author').prefetch_related('tags', 'ingredient_list__ingredient')
+    documents = {}
+    for data in RecipebrowseSerializer(recipes, many=True).data:
+        for flag in FLAGS:
+            data.pop(flag)
+        data['author'].pop('is_subscribed')
+        documents[data['id']] = data
+    return documents
+
+
+def rebuild(recipe_ids):
+    """Пересборка и сохранение документов рецептов."""
+    recipe_ids = set(recipe_ids)
+    with primary():
+        documents = build(recipe_ids)
+    with transaction.atomic():
+        RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeDocument.objects.bulk_create(
+            (RecipeDocument(recipe_id=recipe_id, data=data)
+             for recipe_id, data in documents.items()),
+            ignore_conflicts=True,
+        )
+    return documents
+
+
+def flush_pending():
+    """
+    Ошибка пересборки не отменяет уже закоммиченную запись:
+    она логируется, документы чинит rebuild_documents.
+    """
+    recipe_ids = getattr(pending, 'ids', None)
+    if not recipe_ids:
+        return
+    pending.ids = set()
+    try:
+        rebuild(recipe_ids)
+    except DatabaseError:
+        logger.exception('Ошибка пересборки документов рецептов %s',
+                         sorted(recipe_ids))
+
+
+def schedule_rebuild(recipe_ids):
+    """
+    Пересборка после коммита. Изменения одного рецепта в транзакции
+    собираются вместе, и документ строится один раз.
+    """
+    if not hasattr(pending, 'ids'):
+        pending.ids = set()
+    pending.ids.update(recipe_ids)
+    transaction.on_commit(flush_pending)
+
+
+def personalize(document, relations, request):
+    """Документ с флагами пользователя и абсолютными ссылками."""
+    author = document['author']
+    author = {
+        field: (author['id'] in relations.following
+                if field == 'is_subscribed' else author[field])
+        for field in CustomUserSerializer.Meta.fields
+    }
+    flags = {
+        'is_favorited': document['id'] in relations.favorites,
+        'is_in_shopping_cart': document['id'] in relations.cart,
+    }
+    data = {}
+    for field in RecipebrowseSerializer.field_names:
+        if field == 'author':
+            data[field] = author
+        elif field in flags:
+            data[field] = flags[field]
+        else:
+            data[field] = document[field]
+    if request is not None:
+        if data['image']:
+            data['image'] = request.build_absolute_uri(data['image'])
+        data['image_variants'] = {
+            variant: request.build_absolute_uri(url)
+            for variant, url in data['image_variants'].items()
+        }
+    return data
+
+
+def render(recipe_ids, request):
+    """
+    Рецепты в порядке recipe_ids из готовых документов. Недостающие
+    документы собираются и сохраняются на месте.
+    """
+    documents = dict(RecipeDocument.objects.filter(
+        recipe_id__in=recipe_ids).values_list('recipe_id', 'data'))
+    missing = [
+        recipe_id for recipe_id in recipe_ids if recipe_id not in documents]
+    if missing:
+        documents.update(rebuild(missing))
+    relations = get_relations(request)
+    return [
+        personalize(documents[recipe_id], relations, request)
+        for recipe_id in recipe_ids if recipe_id in documents
+    ]
@@ -1,6 +1,12 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, When
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe, Tag
 
+from .ingredient_search import normalize
+
 
 class Ingredientfilter(FilterSet):
     """Фильтр для ингредиентов"""
@@ -12,6 +18,12 @@ class Ingredientfilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
+    ORDERINGS = {
+        'popular': ('-favorites_count', '-pub_date'),
+        'newest': ('-pub_date',),
+        'cooking_time': ('cooking_time', '-pub_date'),
+    }
+
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
@@ -21,6 +33,11 @@ class RecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=tuple((name, name) for name in ORDERINGS),
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
@@ -37,3 +54,37 @@ class RecipeFilter(FilterSet):
         if value and not user.is_anonymous:
             return queryset.filter(shopping_user__user=user)
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию и описанию с учётом опечаток
+        в названии. Отбор идёт операторами @@ и % по GIN-индексам,
+        сходство считается только для сортировки. Без PostgreSQL ищется
+        вхождение каждого слова: регистр сравнивается в Python, LOWER()
+        в SQLite знает только ASCII.
+        """
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(value, config='russian')
+            return queryset.filter(
+                Q(search_vector=query) | Q(name__trigram_similar=value)
+            ).annotate(
+                rank=(SearchRank(F('search_vector'), query)
+                      + TrigramSimilarity('name', value)),
+            ).order_by('-rank', '-pub_date')
+        phrase = normalize(value)
+        words = phrase.split()
+        found, ranked = [], []
+        for pk, title, text in queryset.values_list('id', 'name', 'text'):
+            title, text = normalize(title), normalize(text)
+            if all(word in title or word in text for word in words):
+                found.append(pk)
+                if phrase in title:
+                    ranked.append(pk)
+        return queryset.filter(id__in=found).annotate(rank=Case(
+            When(id__in=ranked, then=1),
+            default=0,
+            output_field=IntegerField(),
+        )).order_by('-rank', '-pub_date')
@@ -0,0 +1,77 @@
+from bisect import bisect_left
+from operator import itemgetter
+from threading import Lock
+
+from recipes.models import Ingredient
+
+from .cache import INGREDIENTS_VERSION_KEY, bump_version, get_version
+from .replicas import primary
+
+
+def normalize(name):
+    """Приведение названия к виду для поиска."""
+    return name.strip().lower().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Поисковый индекс ингредиентов в памяти воркера.
+    Названия хранятся в отсортированном массиве, поиск по префиксу
+    идёт бинарным поиском, затем добавляются совпадения по подстроке.
+    Индекс перечитывается из базы при смене версии ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = ([], [])
+
+    def _load(self, version):
+        ingredients = Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit')
+        rows = sorted(
+            ((normalize(name), {
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            }) for pk, name, measurement_unit in ingredients),
+            key=itemgetter(0),
+        )
+        self._data = ([key for key, _ in rows], [row for _, row in rows])
+        self._version = version
+
+    def _actual(self):
+        version = get_version(INGREDIENTS_VERSION_KEY)
+        if version != self._version:
+            with self._lock, primary():
+                if version != self._version:
+                    self._load(version)
+        return self._data
+
+    def search(self, name, limit=None):
+        """Ингредиенты, начинающиеся с name, затем содержащие name."""
+        keys, rows = self._actual()
+        query = normalize(name)
+        if not query:
+            return rows[:limit]
+        result = []
+        start = bisect_left(keys, query)
+        for index in range(start, len(keys)):
+            if not keys[index].startswith(query):
+                break
+            result.append(rows[index])
+            if len(result) == limit:
+                return result
+        for key, row in zip(keys, rows):
+            if query in key and not key.startswith(query):
+                result.append(row)
+                if len(result) == limit:
+                    break
+        return result
+
+    @staticmethod
+    def invalidate():
+        bump_version(INGREDIENTS_VERSION_KEY)
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,242 @@
+import json
+import random
+import tempfile
+import tracemalloc
+from io import StringIO
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAQMAAAAl21bKAAAAA'
+    '1BMVEUAAACnej3aAAAAAXRSTlMAQObYZgAAAApJREFUCNdjYAAAAAIAAeIhvDMAAAAASUVO'
+    'RK5CYII='
+)
+# Свой кеш процесса: прогон не трогает общий кеш запущенного сервера.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон API на тестовой базе: p50/p95, '
+            'запросы к БД и выделения памяти по сценариям.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=8,
+                            help='Ингредиентов в одном рецепте')
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--save', help='Сохранить результат в JSON')
+        parser.add_argument('--baseline',
+                            help='Сравнить с сохранённым JSON')
+        parser.add_argument(
+            '--fail-threshold', type=float,
+            help='Ошибка, если p95 вырос больше чем на указанный процент')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Тестовая база создаётся только для default: чтения
+            # с реплик ушли бы в рабочие базы.
+            with override_settings(MEDIA_ROOT=tempfile.mkdtemp(),
+                                   CACHES=BENCHMARK_CACHES,
+                                   DATABASE_REPLICAS=[]):
+                cache.clear()
+                self.seed(options)
+                results = self.run_scenarios(options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.print_results(results)
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            self.compare(results, options['baseline'],
+                         options['fail_threshold'])
+
+    def seed(self, options):
+        """Пользователи, рецепты, теги, избранное, покупки и подписки."""
+        call_command('load_ingredient', stdout=StringIO(),
+                     path=str(settings.BASE_DIR / 'data' / 'ingredients.csv'))
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        User.objects.bulk_create(
+            User(username=f'bench{i}', email=f'bench{i}@example.com',
+                 first_name='Bench', last_name=str(i))
+            for i in range(options['users'])
+        )
+        users = list(User.objects.filter(username__startswith='bench'))
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {i}', color=f'#0000{i:02d}', slug=f'tag{i}')
+            for i in range(5)
+        )
+        tags = list(Tag.objects.all())
+        Recipe.objects.bulk_create(
+            Recipe(author=random.choice(users), name=f'Рецепт {i}',
+                   image='recipes/bench.png', text='Описание',
+                   cooking_time=random.randint(1, 120))
+            for i in range(options['recipes'])
+        )
+        recipes = list(Recipe.objects.values_list('id', flat=True))
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(recipe_id=recipe, ingredient_id=ingredient,
+                                amount=random.randint(1, 500))
+            for recipe in recipes
+            for ingredient in random.sample(
+                ingredients, min(options['ingredients'], len(ingredients)))
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe, tag=tag)
+            for recipe in recipes
+            for tag in random.sample(tags, 2)
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (model(user=user, recipe_id=recipe)
+                 for user in users
+                 for recipe in random.sample(recipes, min(20, len(recipes)))),
+                ignore_conflicts=True,
+            )
+        Follow.objects.bulk_create(
+            (Follow(user=user, author=author)
+             for user in users
+             for author in random.sample(users, min(10, len(users)))
+             if author != user),
+            ignore_conflicts=True,
+        )
+        call_command('recount_recipes', stdout=StringIO())
+        self.user = users[0]
+        self.tag = tags[0].slug
+        self.recipe = Recipe.objects.filter(author=self.user).first() or (
+            Recipe.objects.first())
+        self.ingredients = ingredients
+        self.pantry = ','.join(map(str, set(
+            IngredientsInRecipe.objects.filter(
+                recipe_id__in=recipes[:3]
+            ).values_list('ingredient_id', flat=True))))
+
+    def recipe_payload(self):
+        return {
+            'ingredients': [
+                {'id': ingredient, 'amount': 10}
+                for ingredient in random.sample(self.ingredients, 5)
+            ],
+            'tags': [Tag.objects.values_list('id', flat=True).first()],
+            'image': IMAGE,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+
+    def scenarios(self):
+        recipe = self.recipe.id
+        return {
+            'feed_list': ('get', '/api/recipes/', None),
+            'feed_page_50': ('get', '/api/recipes/?limit=50', None),
+            'feed_filtered': (
+                'get', f'/api/recipes/?tags={self.tag}&is_favorited=1',
+                None),
+            'recipe_detail': ('get', f'/api/recipes/{recipe}/', None),
+            'subscriptions': (
+                'get', '/api/users/subscriptions/?recipes_limit=3', None),
+            'ingredient_search': ('get', '/api/ingredients/?name=мол', None),
+            'ingredient_list': ('get', '/api/ingredients/', None),
+            'cook': (
+                'get', f'/api/recipes/cook/?ingredients={self.pantry}',
+                None),
+            'shopping_cart_download': (
+                'get', '/api/recipes/download_shopping_cart/', None),
+            'recipe_create': ('post', '/api/recipes/', self.recipe_payload),
+            'recipe_update': (
+                'patch', f'/api/recipes/{recipe}/', self.recipe_payload),
+        }
+
+    @staticmethod
+    def request(client, method, url, payload):
+        response = getattr(client, method)(
+            url, payload() if payload else None, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(f'{method.upper()} {url}: '
+                               f'{response.status_code}')
+        return response
+
+    def run_scenarios(self, iterations):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        results = {}
+        for name, (method, url, payload) in self.scenarios().items():
+            self.request(client, method, url, payload)
+            timings, queries = [], []
+            for _ in range(iterations):
+                with CaptureQueriesContext(connection) as context:
+                    start = perf_counter()
+                    self.request(client, method, url, payload)
+                    timings.append((perf_counter() - start) * 1000)
+                queries.append(len(context.captured_queries))
+            tracemalloc.start()
+            self.request(client, method, url, payload)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = {
+                'p50_ms': round(median(timings), 2),
+                'p95_ms': round(quantiles(timings, n=20)[-1], 2)
+                if len(timings) > 1 else round(timings[0], 2),
+                'queries': max(queries),
+                'peak_kb': round(peak / 1024, 1),
+            }
+        return results
+
+    def print_results(self, results):
+        self.stdout.write(f'{"scenario":<24}{"p50_ms":>10}{"p95_ms":>10}'
+                          f'{"queries":>10}{"peak_kb":>10}')
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<24}{row["p50_ms"]:>10}{row["p95_ms"]:>10}'
+                f'{row["queries"]:>10}{row["peak_kb"]:>10}')
+
+    def compare(self, results, path, threshold):
+        """Разница с базовым прогоном в процентах."""
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = []
+        self.stdout.write(f'\nСравнение с {path}:')
+        for name, row in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            changes = {
+                field: (row[field] - base[field]) / base[field] * 100
+                if base[field] else 0.0
+                for field in ('p50_ms', 'p95_ms', 'queries', 'peak_kb')
+            }
+            self.stdout.write(f'{name:<24}' + ''.join(
+                f'{change:>+10.1f}%' for change in changes.values()))
+            if threshold is not None and changes['p95_ms'] > threshold:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f'p95 вырос больше чем на {threshold}%: '
+                f'{", ".join(regressions)}')
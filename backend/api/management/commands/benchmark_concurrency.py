@@ -0,0 +1,105 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from statistics import median, quantiles
+from threading import local
+from time import perf_counter
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=мол',
+)
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность запущенных серверов при параллельных '
+            'запросах, например WSGI и ASGI: '
+            '--target wsgi=http://localhost:8000 '
+            '--target asgi=http://localhost:8001')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='имя=адрес сервера')
+        parser.add_argument('--path', action='append',
+                            help='Путь запроса, по умолчанию горячие чтения')
+        parser.add_argument('--concurrency', default='1,10,50',
+                            help='Числа параллельных клиентов через запятую')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Запросов на каждый уровень параллельности')
+        parser.add_argument('--token', help='Токен авторизации')
+        parser.add_argument('--save', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        targets = dict(
+            target.split('=', 1) for target in options['target']
+            if '=' in target)
+        if len(targets) != len(options['target']):
+            raise CommandError('Цель задаётся как имя=адрес')
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        paths = options['path'] or PATHS
+        headers = {'Connection': 'keep-alive'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        results = {}
+        self.stdout.write(f'{"target":<10}{"clients":>8}{"req/s":>10}'
+                          f'{"p50_ms":>10}{"p95_ms":>10}{"errors":>8}')
+        for name, url in targets.items():
+            for level in levels:
+                row = self.run(url, paths, headers, level,
+                               options['requests'])
+                results.setdefault(name, {})[level] = row
+                self.stdout.write(
+                    f'{name:<10}{level:>8}{row["rps"]:>10}'
+                    f'{row["p50_ms"]:>10}{row["p95_ms"]:>10}'
+                    f'{row["errors"]:>8}')
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    @staticmethod
+    def run(url, paths, headers, clients, total):
+        """
+        total запросов по кругу из paths в clients потоках, у каждого
+        потока своё keep-alive соединение.
+        """
+        parts = urlsplit(url)
+        connection_class = (HTTPSConnection if parts.scheme == 'https'
+                            else HTTPConnection)
+        threads = local()
+
+        def request(number):
+            connection = getattr(threads, 'connection', None)
+            if connection is None:
+                connection = threads.connection = connection_class(
+                    parts.netloc, timeout=30)
+            path = quote(parts.path.rstrip('/') + paths[number % len(paths)],
+                         safe='/?=&,')
+            start = perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (HTTPException, OSError):
+                connection.close()
+                threads.connection = None
+                ok = False
+            return (perf_counter() - start) * 1000, ok
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            results = list(pool.map(request, range(total)))
+        elapsed = perf_counter() - start
+        timings = [timing for timing, ok in results if ok]
+        return {
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(median(timings), 2) if timings else None,
+            'p95_ms': round(quantiles(timings, n=20)[-1], 2)
+            if len(timings) > 1 else None,
+            'errors': len(results) - len(timings),
+        }
@@ -0,0 +1,32 @@
+from api.metrics import collect, report
+from django.core.management.base import BaseCommand
+
+COLUMNS = ('count', 'p50_ms', 'p95_ms', 'avg_ms', 'avg_queries',
+           'avg_db_ms', 'db_ms', 'avg_render_ms', 'avg_bytes')
+
+
+class Command(BaseCommand):
+    help = ('Отчёт о медленных вьюхах по данным воркеров. '
+            'Нужен общий для процессов кеш (CACHE_BACKEND).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Сколько вьюх показать',
+        )
+
+    def handle(self, *args, **options):
+        rows = report(collect(flush=False))[:options['top']]
+        if not rows:
+            self.stdout.write('Нет данных.')
+            return
+        width = max(len(row['view']) for row in rows)
+        self.stdout.write(
+            'view'.ljust(width)
+            + ''.join(column.rjust(13) for column in COLUMNS))
+        for row in rows:
+            self.stdout.write(
+                row['view'].ljust(width)
+                + ''.join(str(row[column]).rjust(13) for column in COLUMNS))
@@ -0,0 +1,19 @@
+from api.documents import rebuild
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Полная пересборка документов рецептов для чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = list(Recipe.objects.order_by('id').values_list(
+            'id', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            rebuild(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано документов: {len(recipe_ids)}'))
@@ -0,0 +1,22 @@
+from api.timeline import CELEBRITIES_KEY, rebuild
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Пересборка лент подписок: последние рецепты авторов, '
+            'кроме популярных, для каждого подписчика.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            help='Только ленты этих пользователей')
+
+    def handle(self, *args, **options):
+        cache.delete(CELEBRITIES_KEY)
+        user_ids = options['user'] or list(Follow.objects.order_by(
+            'user_id').values_list('user_id', flat=True).distinct())
+        for user_id in user_ids:
+            rebuild(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {len(user_ids)}'))
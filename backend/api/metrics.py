@@ -0,0 +1,142 @@
+import os
+import socket
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+WORKERS_KEY = 'metrics_workers'
+
+
+def new_stats():
+    return {
+        'count': 0,
+        'buckets': [0] * (len(BUCKETS) + 1),
+        'total_ms': 0.0,
+        'db_ms': 0.0,
+        'render_ms': 0.0,
+        'queries': 0,
+        'bytes': 0,
+    }
+
+
+def merge(target, stats):
+    """
+    Сложение статистики по вьюхам из stats в target. В снимках
+    воркеров прежней версии может не быть новых полей.
+    """
+    for view, item in stats.items():
+        merged = target.setdefault(view, new_stats())
+        for field in ('count', 'total_ms', 'db_ms', 'render_ms', 'queries',
+                      'bytes'):
+            merged[field] += item.get(field, 0)
+        merged['buckets'] = [
+            left + right
+            for left, right in zip(merged['buckets'], item['buckets'])
+        ]
+    return target
+
+
+def percentile(buckets, share):
+    """
+    Верхняя граница корзины, в которую попадает перцентиль.
+    None, если он за пределами последней корзины.
+    """
+    rank = sum(buckets) * share
+    passed = 0
+    for bound, count in zip(BUCKETS, buckets):
+        passed += count
+        if passed >= rank:
+            return bound
+    return None
+
+
+class Registry:
+    """
+    Скользящие гистограммы по вьюхам в памяти воркера.
+    Статистика хранится поминутно за последние METRICS_WINDOW_MINUTES
+    и периодически сбрасывается в кеш, чтобы отчёт видел все воркеры.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._slots = {}
+        self._flushed = monotonic()
+        self.key = f'metrics:{socket.gethostname()}:{os.getpid()}'
+
+    def record(self, view, total_ms, queries, db_ms, size, render_ms=0.0):
+        minute = int(monotonic() // 60)
+        index = next(
+            (i for i, bound in enumerate(BUCKETS) if total_ms <= bound),
+            len(BUCKETS))
+        with self._lock:
+            stats = self._slots.setdefault(minute, {}).setdefault(
+                view, new_stats())
+            stats['count'] += 1
+            stats['buckets'][index] += 1
+            stats['total_ms'] += total_ms
+            stats['db_ms'] += db_ms
+            stats['render_ms'] += render_ms
+            stats['queries'] += queries
+            stats['bytes'] += size
+        if monotonic() - self._flushed > settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def snapshot(self):
+        first = int(monotonic() // 60) - settings.METRICS_WINDOW_MINUTES
+        with self._lock:
+            for minute in [m for m in self._slots if m <= first]:
+                del self._slots[minute]
+            slots = list(self._slots.values())
+        result = {}
+        for stats in slots:
+            merge(result, stats)
+        return result
+
+    def flush(self):
+        self._flushed = monotonic()
+        timeout = settings.METRICS_WINDOW_MINUTES * 60
+        cache.set(self.key, self.snapshot(), timeout=timeout)
+        workers = cache.get(WORKERS_KEY, set())
+        if self.key not in workers:
+            cache.set(WORKERS_KEY, workers | {self.key}, timeout=None)
+
+
+registry = Registry()
+
+
+def collect(flush=True):
+    """Статистика всех воркеров, сохранивших её в общий кеш."""
+    if flush:
+        registry.flush()
+    workers = cache.get(WORKERS_KEY, set())
+    snapshots = cache.get_many(workers)
+    alive = set(snapshots)
+    if alive != workers:
+        cache.set(WORKERS_KEY, alive, timeout=None)
+    result = {}
+    for stats in snapshots.values():
+        merge(result, stats)
+    return result
+
+
+def report(stats):
+    """Строки отчёта, самые тяжёлые по времени БД сверху."""
+    rows = []
+    for view, item in stats.items():
+        count = item['count'] or 1
+        rows.append({
+            'view': view,
+            'count': item['count'],
+            'p50_ms': percentile(item['buckets'], 0.5),
+            'p95_ms': percentile(item['buckets'], 0.95),
+            'avg_ms': round(item['total_ms'] / count, 2),
+            'avg_queries': round(item['queries'] / count, 2),
+            'avg_db_ms': round(item['db_ms'] / count, 2),
+            'db_ms': round(item['db_ms'], 2),
+            'avg_render_ms': round(item['render_ms'] / count, 2),
+            'avg_bytes': item['bytes'] // count,
+        })
+    return sorted(rows, key=lambda row: row['db_ms'], reverse=True)
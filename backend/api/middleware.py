@@ -0,0 +1,148 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+
+from .metrics import registry
+
+
+class QueryCounter:
+    """
+    Обёртка выполнения SQL: число запросов и суммарное время.
+    Отдельно копится время рендеринга ответа.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.render_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+
+
+current_counter = ContextVar('query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Обёртка SQL на каждом подключении: запрос идёт в счётчик из
+    current_counter. Контекст копируется в потоки sync_to_async
+    и run_sync, поэтому счёт работает в любом потоке запроса.
+    """
+    counter = current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter(execute, sql, params, many, context)
+
+
+def install_counter(connection):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def render(response):
+    """
+    Рендеринг ответа с учётом его времени в счётчике запроса.
+    Уже готовый ответ повторно не рендерится.
+    """
+    counter = current_counter.get()
+    if counter is None or response.is_rendered:
+        return response.render()
+    start = perf_counter()
+    try:
+        return response.render()
+    finally:
+        counter.render_duration += perf_counter() - start
+
+
+@contextmanager
+def counting(counter):
+    """Учёт SQL запроса в текущем контексте."""
+    token = current_counter.set(counter)
+    try:
+        yield
+    finally:
+        current_counter.reset(token)
+
+
+def view_name(view_func, method):
+    """Имя вьюхи с действием, например RecipeViewSet.list."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    """
+    Число запросов к БД, время SQL, рендеринга и ответа по каждой вьюхе.
+    Результат отдаётся в заголовке Server-Timing и копится в registry.
+    Работает и в синхронном, и в асинхронном режиме: счётчик
+    передаётся в потоки с запросами к БД через current_counter.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        counter = QueryCounter()
+        start = perf_counter()
+        with counting(counter):
+            response = self.get_response(request)
+        return self.finish(request, response, counter, start)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        counter = QueryCounter()
+        start = perf_counter()
+        with counting(counter):
+            response = await self.get_response(request)
+        return self.finish(request, response, counter, start)
+
+    def process_template_response(self, request, response):
+        """
+        Middleware стоит первым, поэтому этот хук вызывается последним
+        перед рендерингом: ответ рендерится здесь, под замером.
+        """
+        if settings.METRICS_ENABLED:
+            render(response)
+        return response
+
+    def finish(self, request, response, counter, start):
+        total_ms = (perf_counter() - start) * 1000
+        db_ms = counter.duration * 1000
+        render_ms = counter.render_duration * 1000
+        response['Server-Timing'] = (
+            f'db;desc="{counter.count} queries";dur={db_ms:.1f}, '
+            f'render;dur={render_ms:.1f}, '
+            f'app;dur={total_ms - db_ms - render_ms:.1f}, '
+            f'total;dur={total_ms:.1f}'
+        )
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            size = 0 if response.streaming else len(response.content)
+            registry.record(view_name(match.func, request.method),
+                            total_ms, counter.count, db_ms, size, render_ms)
+        return response
@@ -1,6 +1,79 @@
-from rest_framework.pagination import PageNumberPagination
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+from .filters import RecipeFilter
 
 
 class SimplePagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Пагинация по курсору для бесконечной ленты: без COUNT(*) и OFFSET,
+    поэтому скорость не зависит от глубины страницы.
+    Включается параметром ?pagination=cursor или заголовком
+    X-Pagination: cursor, дальше клиент ходит по ссылкам next/previous.
+    Курсор держит позицию только по дате публикации, поэтому другие
+    сортировки и поиск с ранжированием в этом режиме не поддерживаются.
+    """
+    page_size_query_param = 'limit'
+    page_size = 6
+    ordering = ('-pub_date', '-id')
+
+    @staticmethod
+    def is_requested(request):
+        return ('cursor' in request.query_params
+                or request.query_params.get('pagination') == 'cursor'
+                or request.headers.get('X-Pagination') == 'cursor')
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get('search'):
+            raise ValidationError({'search': [
+                'Поиск недоступен с пагинацией по курсору.'
+            ]})
+        ordering = request.query_params.get('ordering')
+        if ordering and RecipeFilter.ORDERINGS.get(ordering) != (
+                '-pub_date',):
+            raise ValidationError({'ordering': [
+                'С пагинацией по курсору доступна только сортировка newest.'
+            ]})
+        return self.ordering
+
+
+class TimelinePagination(RecipeCursorPagination):
+    """
+    Курсор ленты подписок. Позиция - дата публикации и id последнего
+    рецепта страницы, следующая страница читается с неё по индексу.
+    """
+    max_page_size = 100
+
+    def paginate_timeline(self, request, read):
+        """read(limit, before) -> (id рецептов, позиция следующей)."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        before = None
+        if cursor is not None:
+            pub_date, _, recipe_id = (cursor.position or '').partition('|')
+            pub_date = parse_datetime(pub_date)
+            if pub_date is None or not recipe_id.isdigit():
+                raise NotFound(self.invalid_cursor_message)
+            before = (pub_date, int(recipe_id))
+        recipe_ids, self.next_position = read(
+            self.get_page_size(request), before)
+        return recipe_ids
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        pub_date, recipe_id = self.next_position
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=f'{pub_date.isoformat()}|{recipe_id}'))
+
+    def get_previous_link(self):
+        return None
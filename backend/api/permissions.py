@@ -14,3 +14,10 @@ class IsAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         return (request.method in SAFE_METHODS
                 or request.user.is_admin)
+
+
+class IsAdmin(BasePermission):
+
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated
+                and request.user.is_admin)
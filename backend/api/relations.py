@@ -0,0 +1,72 @@
+from collections import namedtuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+from .replicas import primary
+
+Relations = namedtuple('Relations', ('favorites', 'cart', 'following'))
+
+EMPTY = Relations(frozenset(), frozenset(), frozenset())
+
+
+def version_key(user_id):
+    return f'user_relations_version:{user_id}'
+
+
+def relations_key(user_id, version):
+    return f'user_relations:{user_id}:{version}'
+
+
+def relations_version(user_id):
+    """
+    Версия связей пользователя. Читается до загрузки из БД: если связи
+    изменятся во время загрузки, устаревший снимок ляжет под старой
+    версией и не будет прочитан.
+    """
+    return cache.get_or_set(
+        version_key(user_id), lambda: uuid4().hex, timeout=None)
+
+
+def load_relations(user):
+    with primary():
+        return Relations(
+            frozenset(Favorite.objects.filter(
+                user=user).values_list('recipe_id', flat=True)),
+            frozenset(ShoppingCart.objects.filter(
+                user=user).values_list('recipe_id', flat=True)),
+            frozenset(Follow.objects.filter(
+                user=user).values_list('author_id', flat=True)),
+        )
+
+
+def get_relations(request):
+    """
+    Id избранных рецептов, рецептов в покупках и авторов в подписках
+    текущего пользователя. Загружаются один раз за запрос и хранятся
+    в кеше между запросами до изменения связей.
+    """
+    if request is None or request.user.is_anonymous:
+        return EMPTY
+    relations = getattr(request, '_user_relations', None)
+    if relations is not None:
+        return relations
+    timeout = settings.RELATIONS_CACHE_TIMEOUT
+    if timeout:
+        user_id = request.user.id
+        key = relations_key(user_id, relations_version(user_id))
+        relations = cache.get(key)
+    if relations is None:
+        relations = load_relations(request.user)
+        if timeout:
+            cache.set(key, relations, timeout=timeout)
+    request._user_relations = relations
+    return relations
+
+
+def invalidate_relations(user_id):
+    transaction.on_commit(lambda: cache.delete(version_key(user_id)))
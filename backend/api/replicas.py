@@ -0,0 +1,59 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def primary():
+    """Чтение с основной базы, например для заполнения кешей."""
+    token = use_replica.set(False)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтения внутри ReplicaReadMixin уходят на случайную реплику
+    из DATABASE_REPLICAS, всё остальное - в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and use_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Безопасные методы вьюсета читают с реплик. Токен проверяется
+    по основной базе, чтобы не зависеть от задержки репликации.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = use_replica.set(request.method in SAFE_METHODS)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            use_replica.reset(token)
+
+    def perform_authentication(self, request):
+        with primary():
+            super().perform_authentication(request)
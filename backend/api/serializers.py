@@ -1,11 +1,19 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer
 from drf_extra_fields.fields import Base64ImageField
+from recipes import cart
+from recipes.images import variant_urls
 from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
-from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.serializers import ModelSerializer
-from users.models import Follow, User
+from users.models import User
+
+from .cook_search import cook_index
+from .relations import get_relations
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -31,6 +39,29 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
+class TagReadSerializer(serializers.BaseSerializer):
+    """Быстрое чтение тэга без разбора полей модели."""
+
+    def to_representation(self, tag):
+        return {
+            'id': tag.id,
+            'name': tag.name,
+            'color': tag.color,
+            'slug': tag.slug,
+        }
+
+
+class IngredientReadSerializer(serializers.BaseSerializer):
+    """Быстрое чтение ингредиента без разбора полей модели."""
+
+    def to_representation(self, ingredient):
+        return {
+            'id': ingredient.id,
+            'name': ingredient.name,
+            'measurement_unit': ingredient.measurement_unit,
+        }
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     """
     Сериализатор для модели User.
@@ -62,10 +93,8 @@ class CustomUserSerializer(ModelSerializer):
         )
 
     def get_is_subscribed(self, author):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=user, author=author).exists()
+        relations = get_relations(self.context.get('request'))
+        return author.id in relations.following
 
 
 class FollowSerializer(CustomUserSerializer):
@@ -84,91 +113,121 @@ class FollowSerializer(CustomUserSerializer):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         recipes = obj.recipes.all()
-        if limit:
+        if limit and limit.isdigit():
             recipes = recipes[:int(limit)]
         return RecipeShowSerializer(
             recipes, many=True, read_only=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
-class RecipeShowSerializer(serializers.ModelSerializer):
+class ImageVariantsMixin:
+    """Ссылки на изображение рецепта и его уменьшенные копии."""
 
-    class Meta:
-        model = Recipe
-        fields = (
-            'id',
-            'name',
-            'image',
-            'cooking_time'
-        )
+    def absolute_url(self, url):
+        request = self.context.get('request')
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
 
+    def get_image(self, obj):
+        if not obj.image:
+            return None
+        return self.absolute_url(obj.image.url)
 
-class IngredientsReadInRecipeSerializer(ModelSerializer):
-    """Чтение ингредиентов в рецепте."""
-    id = serializers.IntegerField(source='ingredient.id')
-    name = serializers.CharField(source='ingredient.name', required=False)
-    measurement_unit = serializers.CharField(
-        source='ingredient.measurement_unit', required=False)
+    def get_image_variants(self, obj):
+        return {variant: self.absolute_url(url)
+                for variant, url in variant_urls(obj).items()}
 
-    class Meta:
-        model = IngredientsInRecipe
-        fields = ('id', 'name', 'measurement_unit', 'amount')
 
+class RecipeShowSerializer(ImageVariantsMixin, serializers.BaseSerializer):
+    """Краткое чтение рецепта."""
 
-class RecipebrowseSerializer(ModelSerializer):
-    """Серилизатор чтения рецептов."""
-    tags = TagSerializer(many=True, read_only=True)
-    author = CustomUserSerializer(read_only=True)
-    ingredients = SerializerMethodField()
-    image = Base64ImageField()
-    is_favorited = SerializerMethodField(read_only=True)
-    is_in_shopping_cart = SerializerMethodField(read_only=True)
+    def to_representation(self, recipe):
+        return {
+            'id': recipe.id,
+            'name': recipe.name,
+            'image': self.get_image(recipe),
+            'image_variants': self.get_image_variants(recipe),
+            'cooking_time': recipe.cooking_time,
+        }
 
-    class Meta:
-        model = Recipe
-        fields = (
-            'id',
-            'tags',
-            'author',
-            'ingredients',
-            'is_favorited',
-            'is_in_shopping_cart',
-            'name',
-            'image',
-            'text',
-            'cooking_time',
-        )
 
-    def get_ingredients(self, obj):
-        """Метод ингредиентов в рецепте."""
-        ingredients = IngredientsInRecipe.objects.filter(recipe=obj)
-        serializer = IngredientsReadInRecipeSerializer(ingredients, many=True)
-        return serializer.data
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список рецептов для массового добавления и удаления."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT,
+    )
 
-    def get_is_favorited(self, obj):
-        """
-        Проверка на наличие рецепта в избранном.
-        """
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
 
-    def get_is_in_shopping_cart(self, obj):
-        """
-        Проверка на наличие рецепта в списке покупок.
-        """
-        request = self.context.get('request').user
-        if request.is_anonymous:
-            return False
-        return request.shopping_user.filter(recipe=obj).exists()
+class IngredientsReadInRecipeSerializer(serializers.BaseSerializer):
+    """Чтение ингредиентов в рецепте."""
+
+    def to_representation(self, item):
+        ingredient = item.ingredient
+        return {
+            'id': ingredient.id,
+            'name': ingredient.name,
+            'measurement_unit': ingredient.measurement_unit,
+            'amount': item.amount,
+        }
+
+
+class RecipebrowseSerializer(ImageVariantsMixin, serializers.BaseSerializer):
+    """
+    Серилизатор чтения рецептов. Представление собирается вручную,
+    без разбора полей модели: это самый частый путь чтения.
+    """
+    field_names = (
+        'id',
+        'tags',
+        'author',
+        'ingredients',
+        'is_favorited',
+        'is_in_shopping_cart',
+        'name',
+        'image',
+        'image_variants',
+        'text',
+        'cooking_time',
+    )
+
+    def to_representation(self, recipe):
+        relations = get_relations(self.context.get('request'))
+        author = recipe.author
+        tag = TagReadSerializer().to_representation
+        ingredient = IngredientsReadInRecipeSerializer().to_representation
+        return {
+            'id': recipe.id,
+            'tags': [tag(item) for item in recipe.tags.all()],
+            'author': {
+                'email': author.email,
+                'id': author.id,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'is_subscribed': author.id in relations.following,
+            },
+            'ingredients': [
+                ingredient(item) for item in recipe.ingredient_list.all()],
+            'is_favorited': recipe.id in relations.favorites,
+            'is_in_shopping_cart': recipe.id in relations.cart,
+            'name': recipe.name,
+            'image': self.get_image(recipe),
+            'image_variants': self.get_image_variants(recipe),
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
 
 
 class RecipeAddIngredientSerializer(ModelSerializer):
     """Серилизатор записи ингредиентов в рецепт."""
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientsInRecipe
@@ -177,7 +236,7 @@ class RecipeAddIngredientSerializer(ModelSerializer):
 
 class RecipeCreateorChangesSerializer(ModelSerializer):
     author = CustomUserSerializer(read_only=True)
-    tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = RecipeAddIngredientSerializer(many=True)
     image = Base64ImageField()
 
@@ -194,30 +253,97 @@ class RecipeCreateorChangesSerializer(ModelSerializer):
             'cooking_time',
         )
 
+    @staticmethod
+    def check_exist(model, ids, message):
+        """Проверка всех id одним запросом."""
+        missing = set(ids) - set(model.objects.in_bulk(ids))
+        if missing:
+            raise serializers.ValidationError(
+                f'{message}: {", ".join(map(str, sorted(missing)))}')
+
+    def validate_tags(self, tags):
+        self.check_exist(Tag, tags, 'Теги не найдены')
+        return tags
+
+    def validate_ingredients(self, ingredients):
+        ids = [ingredient['id'] for ingredient in ingredients]
+        repeated = sorted(pk for pk, count in Counter(ids).items()
+                          if count > 1)
+        if repeated:
+            raise serializers.ValidationError(
+                f'Ингредиенты повторяются: {", ".join(map(str, repeated))}')
+        self.check_exist(Ingredient, ids, 'Ингредиенты не найдены')
+        return ingredients
+
     @staticmethod
     def add_ingredients(ingredients, recipe):
         """Метод добавления ингредиентов в рецепт."""
         ingredient_list = [
             IngredientsInRecipe(recipe=recipe,
-                                ingredient=ingredient['id'],
+                                ingredient_id=ingredient['id'],
                                 amount=ingredient['amount'],)
             for ingredient in ingredients]
         IngredientsInRecipe.objects.bulk_create(ingredient_list)
 
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        """
+        Изменение ингредиентов рецепта по разнице со старыми:
+        новые добавляются, у оставшихся меняется количество,
+        лишние удаляются. Повторы одного ингредиента, оставшиеся
+        от прежней записи рецепта, сводятся к одной строке.
+        """
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = {}
+        removed = []
+        for item in IngredientsInRecipe.objects.filter(
+                recipe=recipe).order_by('id'):
+            if (item.ingredient_id in existing
+                    or item.ingredient_id not in amounts):
+                removed.append(item.id)
+            else:
+                existing[item.ingredient_id] = item
+        changed = []
+        for ingredient_id, item in existing.items():
+            amount = amounts[ingredient_id]
+            if amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        if removed:
+            IngredientsInRecipe.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientsInRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(recipe=recipe,
+                                ingredient_id=ingredient_id,
+                                amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         self.add_ingredients(ingredients_data, recipe)
+        cook_index.invalidate([recipe.id])
         recipe.tags.set(tags_data)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        IngredientsInRecipe.objects.filter(recipe=recipe).delete()
-        self.add_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if ingredients is not None:
+            with cart.track_recipe(recipe.id):
+                self.update_ingredients(ingredients, recipe)
+            cook_index.invalidate([recipe.id])
+        if tags is not None:
+            recipe.tags.set(tags)
         return super().update(recipe, validated_data)
 
     def to_representation(self, recipe):
@@ -1,24 +1,123 @@
+import csv
+import json
 from datetime import datetime
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.html import escape
+from rest_framework.negotiation import DefaultContentNegotiation
 
+CHUNK_SIZE = 500
+PDF_CHUNK_SIZE = 64 * 1024
+CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+    'pdf': 'application/pdf',
+}
 
-def shopping_list(ingredients, user):
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """
+    Параметр format у выгрузки задаёт формат файла,
+    а не рендерер DRF.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def iterate(ingredients):
+    return ingredients.order_by('ingredient__name').iterator(
+        chunk_size=CHUNK_SIZE)
+
+
+def txt_rows(ingredients, user, today):
+    yield (f'Дата: {today:%Y-%m-%d}\n\n'
+           f'Покупки для: {user.get_full_name()}\n\n')
+    for ingredient in iterate(ingredients):
+        yield (f'- {ingredient["ingredient__name"]} '
+               f'({ingredient["ingredient__measurement_unit"]})'
+               f' - {ingredient["amount"]}\n')
+    yield f'\nFoodgram ({today:%Y})'
+
+
+def csv_rows(ingredients, user, today):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in iterate(ingredients):
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['amount'],
+        ))
+
+
+def json_rows(ingredients, user, today):
+    yield f'{{"date": "{today:%Y-%m-%d}", "ingredients": ['
+    separator = ''
+    for ingredient in iterate(ingredients):
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['amount'],
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']}'
+
+
+def pdf_rows(ingredients, user, today):
+    """
+    В отличие от остальных форматов PDF не потоковый: weasyprint
+    рендерит документ целиком, поэтому HTML и готовый PDF держатся
+    в памяти, а ответ уходит частями уже после рендеринга.
+    """
+    from weasyprint import HTML
+
+    html = ''.join((
+        '<html><head><meta charset="utf-8"></head><body>',
+        f'<h1>Покупки для: {escape(user.get_full_name())}</h1>',
+        f'<p>Дата: {today:%Y-%m-%d}</p><ul>',
+        *(f'<li>{escape(ingredient["ingredient__name"])} '
+          f'({escape(ingredient["ingredient__measurement_unit"])})'
+          f' - {ingredient["amount"]}</li>'
+          for ingredient in iterate(ingredients)),
+        f'</ul><p>Foodgram ({today:%Y})</p></body></html>',
+    ))
+    document = memoryview(HTML(string=html).write_pdf())
+    for start in range(0, len(document), PDF_CHUNK_SIZE):
+        yield bytes(document[start:start + PDF_CHUNK_SIZE])
+
+
+WRITERS = {
+    'txt': txt_rows,
+    'csv': csv_rows,
+    'json': json_rows,
+    'pdf': pdf_rows,
+}
+
+
+def shopping_list(ingredients, user, file_format='txt'):
+    """
+    Ответ с файлом списка покупок. В ASGI Django перебирает потоковый
+    ответ в цикле событий, где курсор .iterator() недоступен, поэтому
+    файл целиком собирается ещё в потоке вьюхи.
+    """
     today = datetime.today()
-    shopp_list = (
-        f'Дата: {today:%Y-%m-%d}\n\n'
-        f'Покупки для: {user.get_full_name()}\n\n'
+    filename = f'{user.username}_shopp_list.{file_format}'
+    response_class = (HttpResponse if settings.SERVER_MODE == 'asgi'
+                      else StreamingHttpResponse)
+    response = response_class(
+        WRITERS[file_format](ingredients, user, today),
+        content_type=CONTENT_TYPES[file_format],
     )
-    shopp_list += '\n'.join([
-        f'- {ingredient["ingredient__name"]} '
-        f'({ingredient["ingredient__measurement_unit"]})'
-        f' - {ingredient["amount"]}'
-        for ingredient in ingredients
-    ])
-    shopp_list += f'\n\nFoodgram ({today:%Y})'
-
-    filename = f'{user.username}_shopp_list.txt'
-    response = HttpResponse(shopp_list, content_type='text/plain')
     response['Content-Disposition'] = f'attachment; filename={filename}'
 
     return response
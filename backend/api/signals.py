@@ -0,0 +1,208 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from recipes.images import variants_ready
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Follow, User
+
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .cache import TAGS_VERSION_KEY, bump_version, invalidate_feed
+from .cook_search import cook_index
+from .documents import schedule_rebuild
+from .ingredient_search import ingredient_index
+from .middleware import install_counter
+from .relations import invalidate_relations
+from .timeline import backfill, fan_out, schedule, unfollow
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def recipe_changed(sender, **kwargs):
+    """
+    Изменение данных, которые попадают в ленту рецептов. Готовые
+    уменьшенные копии ленту не сбрасывают: до истечения кеша в ней
+    остаются ссылки на оригинал.
+    """
+    invalidate_feed()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def catalog_changed(sender, instance, created, **kwargs):
+    """
+    Изменение тега или ингредиента, которые есть в рецептах. Удаление
+    ингредиента доходит до ленты каскадом по составам рецептов.
+    """
+    if not created and instance.recipes.exists():
+        invalidate_feed()
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """Удаление тега: связи с рецептами удаляются без сигналов."""
+    if instance.recipes.exists():
+        invalidate_feed()
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    """
+    Изменение состава рецепта для поиска по продуктам. Удаление рецепта
+    доходит сюда каскадом по его ингредиентам.
+    """
+    cook_index.invalidate([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Изменение справочника ингредиентов."""
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Изменение справочника тегов."""
+    bump_version(TAGS_VERSION_KEY)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    """Изменение тегов рецепта."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_feed()
+
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Изменение имени или почты автора. Регистрация, обновление
+    остальных полей и пользователи без рецептов ленту не сбрасывают.
+    """
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    if instance.recipes.exists():
+        invalidate_feed()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def relations_changed(sender, instance, **kwargs):
+    """Изменение избранного, списка покупок или подписок пользователя."""
+    invalidate_relations(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход или удаление токена."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_auth_changed(sender, instance, created, update_fields=None,
+                      **kwargs):
+    """
+    Изменение пользователя, в том числе роли, активности и пароля,
+    сбрасывает снимки его токенов. Обновление last_login пропускается.
+    """
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    invalidate_user_tokens(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def recipe_document_changed(sender, instance, **kwargs):
+    """Изменение рецепта или его состава."""
+    schedule_rebuild([instance.recipe_id if sender is IngredientsInRecipe
+                      else instance.id])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_document_changed(sender, instance, **kwargs):
+    """Переименование или удаление тега."""
+    schedule_rebuild(list(instance.recipes.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_document_changed(sender, instance, created, **kwargs):
+    """Переименование ингредиента или смена единицы измерения."""
+    if not created:
+        schedule_rebuild(list(instance.ingredient_list.values_list(
+            'recipe_id', flat=True)))
+
+
+@receiver(post_save, sender=User)
+def author_document_changed(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Изменение имени или почты автора."""
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    schedule_rebuild(list(instance.recipes.values_list('id', flat=True)))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_document_changed(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """
+    Изменение тегов рецепта. При очистке тегов у самого тега
+    рецепты запоминаются до удаления связей.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_rebuild([instance.id])
+    elif action == 'pre_clear':
+        instance._document_recipe_ids = list(
+            instance.recipes.values_list('id', flat=True))
+    elif action == 'post_clear':
+        schedule_rebuild(getattr(instance, '_document_recipe_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        schedule_rebuild(pk_set)
+
+
+@receiver(variants_ready)
+def variants_document_changed(sender, recipe_id, **kwargs):
+    """Готовы уменьшенные копии изображения."""
+    schedule_rebuild([recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """Новый рецепт рассылается по лентам подписчиков автора."""
+    if created:
+        schedule(fan_out, instance.id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Новая подписка: последние рецепты автора появляются в ленте."""
+    if created:
+        schedule(backfill, instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Отписка убирает рецепты автора из ленты."""
+    unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Учёт SQL для метрик на каждом новом подключении."""
+    install_counter(connection)
@@ -0,0 +1,7 @@
+from api.urls import async_urlpatterns, urlpatterns
+from django.urls import include, path
+
+# Маршруты api при ASYNC_VIEWS: асинхронные обёртки перед роутером.
+urlpatterns = [
+    path('api/', include((async_urlpatterns + urlpatterns, 'api'))),
+]
@@ -0,0 +1,37 @@
+from django.test import TestCase, override_settings
+from recipes import cart
+from recipes.models import ShoppingCart
+from rest_framework.authtoken.models import Token
+
+from .utils import create_recipes
+
+
+@override_settings(DATABASE_REPLICAS=[], SERVER_MODE='asgi',
+                   METRICS_ENABLED=True)
+class AsgiModeTest(TestCase):
+    """Синхронные вьюхи под ASGI-обработчиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        (user, *_), recipes = create_recipes(2)
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe) for recipe in recipes)
+        cart.rebuild([user.id])
+        cls.headers = {
+            'authorization': f'Token {Token.objects.create(user=user).key}'}
+
+    async def test_shopping_list_download(self):
+        for file_format in ('txt', 'csv', 'json'):
+            with self.subTest(file_format):
+                response = await self.async_client.get(
+                    '/api/recipes/download_shopping_cart/'
+                    f'?format={file_format}', **self.headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.streaming)
+                self.assertIn('ингредиент 0', response.content.decode())
+
+    async def test_sync_view_queries_counted(self):
+        response = await self.async_client.get(
+            '/api/recipes/shopping_cart_summary/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('"0 queries"', response['Server-Timing'])
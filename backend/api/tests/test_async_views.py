@@ -0,0 +1,34 @@
+from django.test import TransactionTestCase, override_settings
+from recipes.models import Ingredient, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(DATABASE_REPLICAS=[], ROOT_URLCONF='api.tests.async_urls')
+class AsyncViewsTest(TransactionTestCase):
+    """
+    Маршруты ASYNC_VIEWS принимают не только чтение. Вьюсет работает
+    в потоке пула со своим подключением, поэтому без общей транзакции.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass',
+            first_name='Имя', last_name='Фамилия', role=User.ADMIN))
+
+    def test_create_tag(self):
+        response = self.client.post('/api/tags/', {
+            'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
+            format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Tag.objects.filter(slug='breakfast').exists())
+        self.assertEqual(self.client.get('/api/tags/').status_code, 200)
+
+    def test_create_ingredient(self):
+        response = self.client.post('/api/ingredients/', {
+            'name': 'соль', 'measurement_unit': 'г'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Ingredient.objects.filter(name='соль').exists())
+        self.assertEqual(
+            self.client.get('/api/ingredients/').status_code, 200)
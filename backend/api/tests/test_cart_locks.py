@@ -0,0 +1,67 @@
+import threading
+from time import sleep
+from unittest import mock, skipUnless
+
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase, override_settings
+from recipes import cart
+from recipes.models import IngredientsInRecipe
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Блокировки строк проверяются на PostgreSQL')
+@override_settings(DATABASE_REPLICAS=[])
+class CartLockOrderTest(TransactionTestCase):
+    """
+    Изменение состава рецепта и добавление его в список покупок
+    берут блокировки в одном порядке и не упираются друг в друга.
+    """
+
+    def setUp(self):
+        (self.author, self.buyer, *_), (self.recipe,) = create_recipes(1)
+        self.amounts = cart.recipe_amounts
+        self.locked = threading.Event()
+        self.responses = {}
+
+    def request(self, name, user, method, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            self.responses[name] = getattr(client, method)(
+                url, data, format='json').status_code
+        except Exception as error:
+            self.responses[name] = error
+        finally:
+            close_old_connections()
+
+    def slow_amounts(self, recipe_ids):
+        """Правка рецепта держит его блокировку, пока идёт добавление."""
+        if threading.current_thread().name == 'edit' and (
+                not self.locked.is_set()):
+            self.locked.set()
+            sleep(0.5)
+        return self.amounts(recipe_ids)
+
+    def test_edit_while_adding_to_cart(self):
+        ingredient_id = IngredientsInRecipe.objects.filter(
+            recipe=self.recipe).values_list('ingredient_id', flat=True)[0]
+        edit = threading.Thread(name='edit', target=self.request, args=(
+            'edit', self.author, 'patch', f'/api/recipes/{self.recipe.id}/',
+            {'ingredients': [{'id': ingredient_id, 'amount': 100}]}))
+        add = threading.Thread(name='add', target=self.request, args=(
+            'add', self.buyer, 'post',
+            f'/api/recipes/{self.recipe.id}/shopping_cart/'))
+        with mock.patch.object(cart, 'recipe_amounts', self.slow_amounts):
+            edit.start()
+            self.assertTrue(self.locked.wait(5))
+            add.start()
+            edit.join(10)
+            add.join(10)
+        self.assertEqual(self.responses, {'edit': 200, 'add': 201})
+        self.assertEqual(cart.stored([self.buyer.id]),
+                         cart.expected([self.buyer.id]))
+        self.assertEqual(cart.stored([self.buyer.id]),
+                         {(self.buyer.id, ingredient_id): 100})
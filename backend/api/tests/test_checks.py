@@ -0,0 +1,22 @@
+from api.checks import token_cache_check
+from django.test import SimpleTestCase, override_settings
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {
+    'BACKEND': 'django_redis.cache.RedisCache',
+    'LOCATION': 'redis://redis:6379/1'}}
+
+
+class TokenCacheCheckTest(SimpleTestCase):
+
+    def errors(self, caches, timeout):
+        with override_settings(CACHES=caches, TOKEN_CACHE_TIMEOUT=timeout):
+            return [error.id for error in token_cache_check(None)]
+
+    def test_local_cache(self):
+        self.assertEqual(self.errors(LOCMEM, 300), ['api.E002'])
+        self.assertEqual(self.errors(LOCMEM, 0), [])
+
+    def test_shared_cache(self):
+        self.assertEqual(self.errors(REDIS, 300), [])
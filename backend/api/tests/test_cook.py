@@ -0,0 +1,109 @@
+from unittest import mock
+
+from api.cook_search import CookIndex, changes_key, cook_index, current_version
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes.models import Ingredient, IngredientsInRecipe
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class CookIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.author, *_), cls.recipes = create_recipes(4)
+        cls.salt, cls.flour, cls.milk, cls.eggs = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'мука', 'молоко', 'яйца'))
+        IngredientsInRecipe.objects.all().delete()
+        cls.compose({0: (cls.salt, cls.flour),
+                     1: (cls.salt, cls.flour, cls.milk),
+                     2: (cls.milk, cls.eggs),
+                     3: (cls.salt,)})
+
+    @classmethod
+    def compose(cls, recipes):
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(recipe=cls.recipes[number],
+                                ingredient=ingredient, amount=1)
+            for number, ingredients in recipes.items()
+            for ingredient in ingredients)
+
+    def setUp(self):
+        cache.clear()
+        self.index = CookIndex()
+
+    def ids(self, *ingredients):
+        """(номер рецепта, доля, сколько не хватает) по порядку."""
+        numbers = {recipe.id: number
+                   for number, recipe in enumerate(self.recipes)}
+        return [
+            (numbers[recipe_id], round(coverage, 2), missing)
+            for recipe_id, coverage, missing in self.index.search(
+                ingredient.id for ingredient in ingredients)[:10]
+        ]
+
+    def test_ranking(self):
+        self.assertEqual(self.ids(self.salt, self.flour), [
+            (3, 1.0, 0), (0, 1.0, 0), (1, 0.67, 1)])
+        self.assertEqual(len(self.index.search([self.eggs.id])), 1)
+
+    def test_api_pages(self):
+        client = APIClient()
+        url = (f'/api/recipes/cook/?ingredients={self.salt.id},'
+               f'{self.flour.id}&limit=2')
+        first = client.get(url).data
+        second = client.get(f'{url}&page=2').data
+        self.assertEqual(first['count'], 3)
+        self.assertEqual(
+            [item['id'] for item in first['results'] + second['results']],
+            [self.recipes[3].id, self.recipes[0].id, self.recipes[1].id])
+        self.assertEqual(second['results'][0]['missing'], 1)
+
+    def test_changed_recipe_applied_without_reload(self):
+        self.ids(self.eggs)
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientsInRecipe.objects.filter(
+                recipe=self.recipes[2], ingredient=self.milk).delete()
+            IngredientsInRecipe.objects.create(
+                recipe=self.recipes[3], ingredient=self.eggs, amount=1)
+        with mock.patch.object(self.index, '_load') as load:
+            self.assertEqual(self.ids(self.eggs),
+                             [(2, 1.0, 0), (3, 0.5, 1)])
+            self.assertEqual(self.ids(self.milk), [(1, 0.33, 2)])
+        load.assert_not_called()
+
+    def test_lost_changes_reload(self):
+        self.ids(self.eggs)
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientsInRecipe.objects.create(
+                recipe=self.recipes[0], ingredient=self.eggs, amount=1)
+        cache.delete(changes_key(current_version()))
+        self.assertEqual(self.ids(self.eggs), [(2, 0.5, 1), (0, 0.33, 2)])
+
+    def test_recipe_edit_without_ingredients(self):
+        version = current_version()
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/recipes/{self.recipes[0].id}/',
+                                    {'name': 'Новое имя'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(current_version(), version)
+
+    def test_recipe_ingredients_edit(self):
+        cook_index.search([self.salt.id])
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(
+                f'/api/recipes/{self.recipes[0].id}/',
+                {'ingredients': [{'id': self.eggs.id, 'amount': 2}]},
+                format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertNotIn(self.recipes[0].id, [
+            recipe_id for recipe_id, *_ in
+            cook_index.search([self.salt.id])[:10]])
@@ -0,0 +1,65 @@
+from django.test import TestCase, override_settings
+from recipes.models import Favorite, IngredientsInRecipe, Recipe, ShoppingCart
+from rest_framework.test import APIClient
+
+from .utils import IMAGE, create_recipes, temp_media
+
+
+@temp_media
+@override_settings(DATABASE_REPLICAS=[])
+class RecipeCountersTest(TestCase):
+    """Счётчики избранного и списка покупок вне API."""
+
+    def setUp(self):
+        users, recipes = create_recipes(1, authors=1)
+        self.user, self.recipe = users[0], recipes[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counter(self, field):
+        return Recipe.objects.values_list(field, flat=True).get(
+            id=self.recipe.id)
+
+    def test_created_outside_api_then_deleted_by_api(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(self.counter('favorites_count'), 1)
+        response = self.client.delete(
+            f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counter('favorites_count'), 0)
+
+    def test_user_delete_cascades(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.counter('in_carts_count'), 1)
+        reader, _ = create_recipes(0, authors=1, prefix='reader')
+        ShoppingCart.objects.create(user=reader[0], recipe=self.recipe)
+        self.assertEqual(self.counter('in_carts_count'), 2)
+        reader[0].delete()
+        self.assertEqual(self.counter('in_carts_count'), 1)
+
+    def test_decrement_stops_at_zero(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Recipe.objects.filter(id=self.recipe.id).update(favorites_count=0)
+        response = self.client.delete(
+            f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counter('favorites_count'), 0)
+
+    def test_recipe_created_by_api(self):
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [{'id': IngredientsInRecipe.objects.filter(
+                recipe=self.recipe).values_list(
+                    'ingredient_id', flat=True).first(), 'amount': 10}],
+            'tags': [self.recipe.tags.values_list('id', flat=True).first()],
+            'image': IMAGE,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.recipe = Recipe.objects.get(id=response.data['id'])
+        self.assertEqual(self.counter('favorites_count'), 0)
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(self.counter('favorites_count'), 1)
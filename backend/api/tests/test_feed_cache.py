@@ -0,0 +1,64 @@
+from api.cache import FEED_VERSION_KEY, get_version
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes.models import Ingredient, IngredientsInRecipe, Tag
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class FeedCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _, (cls.recipe,) = create_recipes(1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def assertFeedKept(self, action):
+        version = get_version(FEED_VERSION_KEY)
+        self.change(action)
+        self.assertEqual(get_version(FEED_VERSION_KEY), version)
+
+    def assertFeedReset(self, action):
+        version = get_version(FEED_VERSION_KEY)
+        self.change(action)
+        self.assertNotEqual(get_version(FEED_VERSION_KEY), version)
+
+    def test_cached_page_survives_new_ingredient(self):
+        self.client.get('/api/recipes/')
+        self.change(lambda: Ingredient.objects.create(
+            name='новый', measurement_unit='г'))
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unused_catalog_changes_keep_feed(self):
+        ingredient = Ingredient.objects.create(
+            name='лишний', measurement_unit='г')
+        tag = Tag.objects.create(name='Лишний', slug='spare',
+                                 color='#ABCDE1')
+        ingredient.name = 'ненужный'
+        self.assertFeedKept(ingredient.save)
+        self.assertFeedKept(lambda: Tag.objects.create(
+            name='Новый', slug='new', color='#ABCDE2'))
+        self.assertFeedKept(tag.delete)
+        self.assertFeedKept(ingredient.delete)
+
+    def test_used_catalog_changes_reset_feed(self):
+        row = IngredientsInRecipe.objects.filter(recipe=self.recipe).first()
+        ingredient = row.ingredient
+        ingredient.measurement_unit = 'кг'
+        self.assertFeedReset(ingredient.save)
+        tag = self.recipe.tags.first()
+        tag.name = 'Переименован'
+        self.assertFeedReset(tag.save)
+        self.assertFeedReset(tag.delete)
+        self.assertFeedReset(ingredient.delete)
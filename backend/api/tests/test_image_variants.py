@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from recipes import images
+from recipes.models import IngredientsInRecipe, Recipe
+from rest_framework.test import APIClient
+
+from .utils import IMAGE, create_recipes, temp_media
+
+
+@temp_media
+@override_settings(DATABASE_REPLICAS=[])
+class ImageVariantsTest(TestCase):
+    """Уменьшенные копии изображения рецепта."""
+
+    def setUp(self):
+        (self.user,), _ = create_recipes(0, authors=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        scheduled = mock.patch('recipes.signals.schedule_variants')
+        self.schedule = scheduled.start()
+        self.addCleanup(scheduled.stop)
+
+    def create(self):
+        _, (recipe,) = create_recipes(1, authors=1, prefix='img')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'ingredients': [{'id': IngredientsInRecipe.objects.filter(
+                    recipe=recipe).values_list(
+                        'ingredient_id', flat=True).first(), 'amount': 10}],
+                'tags': [recipe.tags.values_list('id', flat=True).first()],
+                'image': IMAGE,
+                'name': 'С картинкой',
+                'text': 'Описание',
+                'cooking_time': 10,
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(id=response.data['id'])
+
+    def test_scheduled_only_for_new_image(self):
+        recipe = self.create()
+        self.schedule.assert_called_once_with(recipe.id, recipe.image.name)
+        self.schedule.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/', {'name': 'Новое название'},
+                format='json')
+        self.assertEqual(response.status_code, 200)
+        self.schedule.assert_not_called()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/', {'image': IMAGE},
+                format='json')
+        self.assertEqual(response.status_code, 200)
+        recipe.refresh_from_db()
+        self.schedule.assert_called_once_with(recipe.id, recipe.image.name)
+
+    def test_urls_follow_ready_marks(self):
+        recipe = self.create()
+        with mock.patch.object(images.default_storage, 'exists') as exists:
+            urls = images.variant_urls(recipe)
+        exists.assert_not_called()
+        self.assertEqual(set(urls.values()), {recipe.image.url})
+        images.make_variants(recipe.id, recipe.image.name)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, list(images.VARIANTS))
+        self.assertEqual(
+            images.variant_urls(recipe)['card'],
+            images.default_storage.url(
+                images.variant_name(recipe.image.name, 'card')))
+
+    def test_replaced_image_is_not_marked(self):
+        recipe = self.create()
+        old = recipe.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/recipes/{recipe.id}/', {'image': IMAGE},
+                              format='json')
+        with mock.patch.object(images.variants_ready, 'send') as ready:
+            images.make_variants(recipe.id, old)
+        ready.assert_not_called()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, [])
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from api.ingredient_search import IngredientIndex
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes.models import Ingredient
+from rest_framework.test import APIClient
+
+
+@override_settings(DATABASE_REPLICAS=[], INGREDIENT_SEARCH_LIMIT=3,
+                   INGREDIENT_SEARCH_MAX_LIMIT=5)
+class IngredientIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('Мука пшеничная', 'мука ржаная', 'сахар', 'Ёжевика',
+                     'овсяная мука', 'мускатный орех', 'мускус', 'мусс',
+                     'мутовка', 'мушмула', 'ежевичный джем'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        self.index = IngredientIndex()
+
+    def names(self, query, limit=None):
+        return [row['name'] for row in self.index.search(query, limit)]
+
+    def test_prefix_before_substring(self):
+        self.assertEqual(self.names('мука'), [
+            'Мука пшеничная', 'мука ржаная', 'овсяная мука'])
+
+    def test_yo_normalized(self):
+        self.assertEqual(self.names('еже'), ['Ёжевика', 'ежевичный джем'])
+        self.assertEqual(self.names('ЁЖЕВ'), ['Ёжевика', 'ежевичный джем'])
+
+    def test_reload_after_save(self):
+        self.assertEqual(self.names('сах'), ['сахар'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='сахарная пудра',
+                                      measurement_unit='г')
+        self.assertEqual(self.names('сах'), ['сахар', 'сахарная пудра'])
+
+    def test_api_limit(self):
+        client = APIClient()
+        with mock.patch('api.views.ingredient_index', self.index):
+            default = client.get('/api/ingredients/', {'name': 'му'})
+            capped = client.get('/api/ingredients/',
+                                {'name': 'му', 'limit': 1000})
+            zero = client.get('/api/ingredients/',
+                              {'name': 'му', 'limit': 0})
+        self.assertEqual(len(default.data), 3)
+        self.assertEqual(len(capped.data), 5)
+        self.assertEqual(len(zero.data), 1)
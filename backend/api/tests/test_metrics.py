@@ -0,0 +1,54 @@
+import re
+from time import sleep
+from unittest import mock
+
+from api.metrics import registry
+from api.renderers import FastJSONRenderer
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .utils import create_recipes
+
+render = FastJSONRenderer.render
+
+
+def slow_render(self, *args, **kwargs):
+    sleep(0.05)
+    return render(self, *args, **kwargs)
+
+
+class RenderTimingMixin:
+
+    def assertRenderTimed(self, path):
+        view = 'TagViewSet.list'
+        before = registry.snapshot().get(view, {}).get('render_ms', 0.0)
+        with mock.patch.object(FastJSONRenderer, 'render', slow_render):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        timing = dict(re.findall(r'(\w+);(?:desc="[^"]*";)?dur=([\d.]+)',
+                                 response['Server-Timing']))
+        self.assertGreaterEqual(float(timing['render']), 50)
+        self.assertLess(float(timing['app']), float(timing['total']) - 50)
+        self.assertGreaterEqual(
+            registry.snapshot()[view]['render_ms'] - before, 50)
+
+
+@override_settings(DATABASE_REPLICAS=[], METRICS_ENABLED=True)
+class RenderTimingTest(RenderTimingMixin, TestCase):
+    """Время рендеринга ответа отделено от времени вьюхи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(1)
+
+    def test_sync_view(self):
+        self.assertRenderTimed('/api/tags/')
+
+
+@override_settings(DATABASE_REPLICAS=[], METRICS_ENABLED=True,
+                   ROOT_URLCONF='api.tests.async_urls')
+class AsyncRenderTimingTest(RenderTimingMixin, TransactionTestCase):
+    """Асинхронная обёртка рендерит ответ в потоке пула под замером."""
+
+    def test_async_view(self):
+        create_recipes(1)
+        self.assertRenderTimed('/api/tags/')
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class RecipeCursorPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(8)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_newest_pages_cover_feed(self):
+        url = '/api/recipes/?pagination=cursor&ordering=newest&limit=5'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+    def test_other_orderings_rejected(self):
+        for ordering in ('popular', 'cooking_time'):
+            with self.subTest(ordering):
+                response = self.client.get(
+                    f'/api/recipes/?pagination=cursor&ordering={ordering}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ordering', response.data)
+
+    def test_search_rejected(self):
+        response = self.client.get(
+            '/api/recipes/?pagination=cursor&search=r1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.data)
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+URL = '/api/recipes/?limit=50'
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class RecipeListQueriesTest(TestCase):
+    """Число запросов ленты не зависит от числа рецептов на странице."""
+
+    # Первое чтение собирает документы рецептов, дальше они готовы
+    MAX_COLD_QUERIES = 15
+    MAX_QUERIES = 6
+
+    def count_queries(self, client):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assert_bounded(self, client):
+        cold, warm = [], []
+        for prefix in ('a', 'b'):
+            create_recipes(25, prefix=prefix)
+            cold.append(self.count_queries(client))
+            warm.append(self.count_queries(client))
+        self.assertEqual(cold[0], cold[1])
+        self.assertEqual(warm[0], warm[1])
+        self.assertLessEqual(cold[0], self.MAX_COLD_QUERIES)
+        self.assertLessEqual(warm[0], self.MAX_QUERIES)
+
+    def test_anonymous(self):
+        self.assert_bounded(APIClient())
+
+    def test_authenticated(self):
+        users, _ = create_recipes(1, authors=1, prefix='viewer')
+        client = APIClient()
+        client.force_authenticate(users[0])
+        self.assert_bounded(client)
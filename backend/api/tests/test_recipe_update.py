@@ -0,0 +1,52 @@
+from django.test import TestCase, override_settings
+from recipes.models import IngredientsInRecipe
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class RecipeIngredientsUpdateTest(TestCase):
+
+    def setUp(self):
+        (self.author, *_), (self.recipe,) = create_recipes(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.first, self.second = IngredientsInRecipe.objects.filter(
+            recipe=self.recipe).order_by('id').values_list(
+            'ingredient_id', flat=True)
+
+    def rows(self):
+        return sorted(IngredientsInRecipe.objects.filter(
+            recipe=self.recipe).values_list('ingredient_id', 'amount'))
+
+    def patch(self, ingredients):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'ingredients': [{'id': pk, 'amount': amount}
+                             for pk, amount in ingredients]},
+            format='json')
+
+    def test_duplicate_ids_rejected(self):
+        before = self.rows()
+        response = self.patch([(self.first, 5), (self.first, 7)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        self.assertEqual(self.rows(), before)
+
+    def test_old_duplicate_rows_collapsed(self):
+        IngredientsInRecipe.objects.create(
+            recipe=self.recipe, ingredient_id=self.first, amount=9)
+        response = self.patch([(self.first, 4)])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.rows(), [(self.first, 4)])
+
+    def test_diff_keeps_rows(self):
+        kept = IngredientsInRecipe.objects.get(
+            recipe=self.recipe, ingredient_id=self.first).id
+        response = self.patch([(self.first, 6), (self.second, 2)])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.rows(),
+                         sorted([(self.first, 6), (self.second, 2)]))
+        self.assertTrue(IngredientsInRecipe.objects.filter(
+            id=kept, amount=6).exists())
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from api import relations
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from recipes.models import Favorite
+
+from .utils import create_recipes
+
+
+@override_settings(DATABASE_REPLICAS=[], RELATIONS_CACHE_TIMEOUT=300)
+class RelationsCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user, *_), cls.recipes = create_recipes(2)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return relations.get_relations(request)
+
+    def test_change_during_load_is_not_cached(self):
+        load = relations.load_relations
+
+        def racing_load(user):
+            loaded = load(user)
+            with self.captureOnCommitCallbacks(execute=True):
+                Favorite.objects.create(user=user, recipe=self.recipes[0])
+            return loaded
+
+        with mock.patch.object(relations, 'load_relations', racing_load):
+            self.assertEqual(self.get().favorites, frozenset())
+        self.assertEqual(self.get().favorites, {self.recipes[0].id})
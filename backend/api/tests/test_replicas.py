@@ -0,0 +1,97 @@
+from unittest import skipUnless
+
+from api.replicas import ReplicaRouter, primary, use_replica
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Favorite, Recipe
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+REPLICA = 'replica_0'
+# Реплика из DB_REPLICA_HOSTS, если настроена: алиас в databases
+# должен существовать, иначе тесты не запустятся вовсе.
+CONFIGURED = settings.DATABASE_REPLICAS[:1]
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def read(self):
+        return self.router.db_for_read(Recipe)
+
+    def test_read(self):
+        self.assertIsNone(self.read())
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(self.read(), REPLICA)
+            with primary():
+                self.assertIsNone(self.read())
+            with override_settings(DATABASE_REPLICAS=[]):
+                self.assertIsNone(self.read())
+        finally:
+            use_replica.reset(token)
+
+    def test_write(self):
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        finally:
+            use_replica.reset(token)
+
+    def test_allow_migrate(self):
+        self.assertIs(self.router.allow_migrate(REPLICA, 'recipes'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'recipes'))
+
+
+@skipUnless(CONFIGURED, 'Нужна реплика: DB_REPLICA_HOSTS')
+@override_settings(DATABASE_REPLICAS=CONFIGURED, TOKEN_CACHE_TIMEOUT=0)
+class ReplicaReadMixinTest(TransactionTestCase):
+    """Реплика - зеркало тестовой базы, разное только подключение."""
+
+    databases = {'default', *CONFIGURED}
+
+    def setUp(self):
+        cache.clear()
+        (self.user, *_), recipes = create_recipes(2)
+        self.recipe = recipes[0]
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}')
+
+    def request(self, method, url):
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections[CONFIGURED[0]]) as replica:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400)
+        return ([query['sql'] for query in default],
+                [query['sql'] for query in replica])
+
+    def assertAuthOnDefault(self, default, replica):
+        table = Token._meta.db_table
+        self.assertTrue(any(table in sql for sql in default))
+        self.assertFalse(any(table in sql for sql in replica))
+
+    def test_get_reads_replica(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/'):
+            with self.subTest(url):
+                cache.clear()
+                default, replica = self.request('get', url)
+                self.assertTrue(any(
+                    Recipe._meta.db_table in sql for sql in replica))
+                self.assertAuthOnDefault(default, replica)
+
+    def test_write_uses_default(self):
+        default, replica = self.request(
+            'post', f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(replica, [])
+        self.assertTrue(any(
+            Favorite._meta.db_table in sql for sql in default))
+        self.assertAuthOnDefault(default, replica)
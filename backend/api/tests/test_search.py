@@ -0,0 +1,37 @@
+from unittest import skipIf
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from recipes.models import Recipe
+from rest_framework.test import APIClient
+
+from .utils import create_recipes
+
+
+@skipIf(connection.vendor == 'postgresql',
+        'На PostgreSQL работает полнотекстовый поиск')
+@override_settings(DATABASE_REPLICAS=[])
+class RecipeSearchFallbackTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _, recipes = create_recipes(3)
+        cls.soup, cls.salad, _ = recipes
+        Recipe.objects.filter(id=cls.soup.id).update(
+            name='Борщ украинский', text='Со свёклой')
+        Recipe.objects.filter(id=cls.salad.id).update(
+            name='Салат', text='Подаётся к борщу')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def search(self, value):
+        response = self.client.get('/api/recipes/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_cyrillic_case_insensitive(self):
+        self.assertEqual(self.search('БОРЩ'), [self.soup.id, self.salad.id])
+        self.assertEqual(self.search('Украинский СВЕКЛОЙ'), [self.soup.id])
@@ -0,0 +1,60 @@
+import tempfile
+
+from django.test import override_settings
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
+from users.models import User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAQMAAAAl21bKAAAAA'
+    '1BMVEUAAACnej3aAAAAAXRSTlMAQObYZgAAAApJREFUCNdjYAAAAAIAAeIhvDMAAAAASUVO'
+    'RK5CYII='
+)
+
+
+def temp_media(test_class):
+    """Загрузки изображений в тестах не попадают в backend/media."""
+    return override_settings(
+        MEDIA_ROOT=tempfile.mkdtemp(prefix='foodgram-media-'))(test_class)
+
+
+def create_recipes(count, authors=3, prefix='r'):
+    """Рецепты с тегами и ингредиентами от нескольких авторов."""
+    users = [
+        User.objects.create_user(
+            username=f'{prefix}author{number}',
+            email=f'{prefix}author{number}@example.com',
+            password='pass12345!X', first_name='Имя', last_name='Фамилия')
+        for number in range(authors)
+    ]
+    tags = [
+        Tag.objects.get_or_create(
+            slug=f'tag{number}',
+            defaults={'name': f'Тег {number}', 'color': f'#00000{number}'})[0]
+        for number in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.get_or_create(
+            name=f'ингредиент {number}', measurement_unit='г')[0]
+        for number in range(5)
+    ]
+    recipes = Recipe.objects.bulk_create(
+        Recipe(author=users[number % authors], name=f'{prefix}{number}',
+               text='Описание', cooking_time=number % 60 + 1,
+               image=f'recipes/{prefix}{number}.png')
+        for number in range(count)
+    )
+    if not recipes or recipes[0].id is None:
+        recipes = list(Recipe.objects.filter(
+            name__startswith=prefix).order_by('id'))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id,
+                            tag_id=tags[number % 3].id)
+        for number, recipe in enumerate(recipes)
+    )
+    IngredientsInRecipe.objects.bulk_create(
+        IngredientsInRecipe(recipe=recipe,
+                            ingredient=ingredients[(number + shift) % 5],
+                            amount=shift + 1)
+        for number, recipe in enumerate(recipes) for shift in range(2)
+    )
+    return users, recipes
@@ -0,0 +1,130 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Q
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+from .replicas import primary
+
+CELEBRITIES_KEY = 'timeline_celebrities'
+BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def celebrities():
+    """
+    Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT: их
+    рецепты не рассылаются по лентам, а подмешиваются при чтении.
+    Рецепты автора, опустившегося ниже порога, возвращает в ленты
+    rebuild_timeline.
+    """
+    def popular():
+        return set(Follow.objects.order_by().values('author_id').annotate(
+            total=Count('id')
+        ).filter(
+            total__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('author_id', flat=True))
+
+    return cache.get_or_set(CELEBRITIES_KEY, popular,
+                            timeout=settings.TIMELINE_CELEBRITIES_TIMEOUT)
+
+
+def add_entries(user_ids, recipes):
+    """Записи ленты для пар подписчик x (id, дата публикации)."""
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                       pub_date=pub_date)
+         for user_id in user_ids for recipe_id, pub_date in recipes),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(recipe_id):
+    """Новый рецепт попадает в ленты всех подписчиков автора."""
+    with primary():
+        recipe = Recipe.objects.filter(id=recipe_id).values(
+            'author_id', 'pub_date').first()
+        if recipe is None or recipe['author_id'] in celebrities():
+            return
+        add_entries(Follow.objects.filter(
+            author_id=recipe['author_id']).values_list('user_id', flat=True),
+            [(recipe_id, recipe['pub_date'])])
+
+
+def backfill(user_id, author_ids):
+    """Последние рецепты авторов в ленте подписчика."""
+    celebrity_ids = celebrities()
+    with primary():
+        for author_id in author_ids:
+            if author_id in celebrity_ids:
+                continue
+            add_entries([user_id], Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-pub_date').values_list(
+                'id', 'pub_date')[:settings.TIMELINE_BACKFILL])
+
+
+def unfollow(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(user_id):
+    """Лента пользователя заново по его подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    backfill(user_id, list(Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True)))
+
+
+def schedule(func, *args):
+    """
+    Запись в ленты после коммита. Ошибка не отменяет саму публикацию
+    или подписку: она логируется, ленты чинит rebuild_timeline.
+    """
+    def run():
+        try:
+            func(*args)
+        except DatabaseError:
+            logger.exception('Ошибка обновления лент подписок: %s%s',
+                             func.__name__, args)
+
+    transaction.on_commit(run)
+
+
+def before_position(queryset, field, before):
+    if before is None:
+        return queryset
+    pub_date, recipe_id = before
+    return queryset.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, **{
+            f'{field}__lt': recipe_id}),
+        pub_date__lte=pub_date,
+    )
+
+
+def read(user_id, following, limit, before=None):
+    """
+    Страница ленты подписок: до limit рецептов старше позиции before
+    (дата публикации, id). Собственная лента читается одним проходом
+    по индексу, рецепты популярных авторов из подписок подмешиваются
+    из recipe_author_pub_date_idx. Возвращает id рецептов и позицию
+    следующей страницы.
+    """
+    rows = list(before_position(
+        TimelineEntry.objects.filter(user_id=user_id), 'recipe_id', before
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id')[:limit + 1])
+    stars = set(following) & celebrities()
+    if stars:
+        rows = sorted(set(rows) | set(before_position(
+            Recipe.objects.filter(author_id__in=stars), 'id', before
+        ).order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id')[:limit + 1]), reverse=True)
+    position = rows[limit - 1] if len(rows) > limit else None
+    return [recipe_id for _, recipe_id in rows[:limit]], position
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from .async_views import async_view
+from .views import (CustomUserViewSet, IngredientViewSet, MetricsViewSet,
+                    RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -12,6 +14,7 @@ router.register('users', CustomUserViewSet, basename='users')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('tags', TagViewSet, basename='tags')
+router.register('metrics', MetricsViewSet, basename='metrics')
 
 
 urlpatterns = [
@@ -19,3 +22,24 @@ urlpatterns = [
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+# Асинхронные обёртки горячих чтений. Они стоят перед роутером,
+# поэтому принимают все методы его маршрутов, а не только GET.
+async_urlpatterns = [
+    path('recipes/', async_view(
+        RecipeViewSet, {'get': 'list', 'post': 'create'},
+        basename='recipes', detail=False)),
+    path('recipes/<int:pk>/', async_view(
+        RecipeViewSet, {'get': 'retrieve', 'put': 'update',
+                        'patch': 'partial_update', 'delete': 'destroy'},
+        basename='recipes', detail=True)),
+    path('ingredients/', async_view(
+        IngredientViewSet, {'get': 'list', 'post': 'create'},
+        basename='ingredients', detail=False)),
+    path('tags/', async_view(
+        TagViewSet, {'get': 'list', 'post': 'create'},
+        basename='tags', detail=False)),
+]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns.insert(0, path('', include(async_urlpatterns)))
@@ -1,24 +1,42 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+from recipes import cart, counters
+from recipes.models import (CartIngredient, Favorite, Ingredient, Recipe,
                             ShoppingCart, Tag)
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404 as get_or_404
 from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ViewSet
 from users.models import Follow, User
 
+from .cache import (FEED_VERSION_KEY, INGREDIENTS_VERSION_KEY,
+                    TAGS_VERSION_KEY, feed_cache_key, get_cached_feed,
+                    get_version, set_cached_feed)
+from .conditional import conditional_response
+from .cook_search import cook_index
+from .documents import render
 from .filters import Ingredientfilter, RecipeFilter
-from .pagination import SimplePagination
-from .permissions import IsAdminAuthorOrReadOnly, IsAdminOrReadOnly
+from .ingredient_search import ingredient_index
+from .metrics import collect, report
+from .pagination import (RecipeCursorPagination, SimplePagination,
+                         TimelinePagination)
+from .permissions import IsAdmin, IsAdminAuthorOrReadOnly, IsAdminOrReadOnly
+from .relations import get_relations, invalidate_relations
+from .replicas import ReplicaReadMixin
 from .serializers import (CustomUserSerializer, FollowSerializer,
-                          IngredientSerializer, RecipebrowseSerializer,
-                          RecipeCreateorChangesSerializer,
-                          RecipeShowSerializer, TagSerializer)
-from .shop_list import shopping_list
+                          IngredientReadSerializer, IngredientSerializer,
+                          RecipebrowseSerializer,
+                          RecipeCreateorChangesSerializer, RecipeIdsSerializer,
+                          RecipeShowSerializer, TagReadSerializer,
+                          TagSerializer)
+from .shop_list import WRITERS, ShoppingListNegotiation, shopping_list
+from .timeline import read as read_timeline
 
 
 class CustomUserViewSet(UserViewSet):
@@ -57,7 +75,19 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        limit = request.query_params.get('recipes_limit')
+        recipes = Recipe.objects.all()
+        if limit and limit.isdigit():
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:int(limit)]
+            ))
+        queryset = User.objects.filter(following__user=user).annotate(
+            recipes_count=Count('recipes', distinct=True),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        ).order_by('id')
         pages = self.paginate_queryset(queryset)
         serializer = FollowSerializer(pages,
                                       many=True,
@@ -65,7 +95,7 @@ class CustomUserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ModelViewSet):
     """Вьюсет для рецепта."""
     queryset = Recipe.objects.all()
     permission_classes = (IsAdminAuthorOrReadOnly,)
@@ -73,6 +103,67 @@ class RecipeViewSet(ModelViewSet):
     pagination_class = SimplePagination
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """
+        Рецепты со связанными данными, чтобы число запросов
+        не зависело от размера страницы. Список и детали рецепта
+        читаются из готовых документов, связи им не нужны.
+        """
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.all()
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'ingredient_list__ingredient')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (self.action == 'list'
+                and RecipeCursorPagination.is_requested(request)):
+            self.pagination_class = RecipeCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        """Лента рецептов. Для анонимных пользователей кешируется."""
+        if not request.user.is_anonymous:
+            return self.render_list(request)
+        key = feed_cache_key(request)
+        data = get_cached_feed(key) if key else None
+        if data is not None:
+            return Response(data)
+        response = self.render_list(request)
+        if key and response.status_code == status.HTTP_200_OK:
+            set_cached_feed(key, response.data)
+        return response
+
+    def render_list(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = queryset if page is None else page
+        data = render([recipe.id for recipe in recipes], request)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Рецепт с ETag: версия данных ленты, дата изменения рецепта
+        и флаги текущего пользователя.
+        """
+        recipe = get_or_404(
+            Recipe.objects.values('id', 'author_id', 'updated'),
+            pk=kwargs['pk'])
+        relations = get_relations(request)
+        key = (
+            f'recipe:{recipe["id"]}:{recipe["updated"].isoformat()}:'
+            f'{get_version(FEED_VERSION_KEY)}:'
+            f'{recipe["id"] in relations.favorites}:'
+            f'{recipe["id"] in relations.cart}:'
+            f'{recipe["author_id"] in relations.following}'
+        )
+        return conditional_response(
+            request, key,
+            lambda: Response(render([recipe['id']], request)[0]),
+            last_modified=recipe['updated'],
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -81,6 +172,40 @@ class RecipeViewSet(ModelViewSet):
             return RecipebrowseSerializer
         return RecipeCreateorChangesSerializer
 
+    @action(detail=False)
+    def cook(self, request):
+        """
+        Что приготовить из имеющихся продуктов: рецепты по убыванию
+        доли имеющихся ингредиентов, затем по числу недостающих.
+        """
+        ids = [
+            value
+            for param in request.query_params.getlist('ingredients')
+            for value in param.split(',')
+        ]
+        if not ids or not all(value.isdigit() for value in ids):
+            message = 'Укажите id ингредиентов в параметре ingredients.'
+            return Response(message, status=status.HTTP_400_BAD_REQUEST)
+        matches = self.paginate_queryset(
+            cook_index.search(map(int, ids)))
+        data = render([recipe_id for recipe_id, _, _ in matches], request)
+        matches = {recipe_id: match for recipe_id, *match in matches}
+        for item in data:
+            coverage, missing = matches[item['id']]
+            item['coverage'] = round(coverage, 3)
+            item['missing'] = missing
+        return self.get_paginated_response(data)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def timeline(self, request):
+        """Лента рецептов авторов из подписок, новые сверху."""
+        following = get_relations(request).following
+        paginator = TimelinePagination()
+        recipe_ids = paginator.paginate_timeline(
+            request, lambda limit, before: read_timeline(
+                request.user.id, following, limit, before))
+        return paginator.get_paginated_response(render(recipe_ids, request))
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -102,56 +227,215 @@ class RecipeViewSet(ModelViewSet):
         return self.delete_from(ShoppingCart, request.user, pk)
 
     def add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
-            message = 'Рецепт уже добавлен!'
-            return Response(message, status=status.HTTP_400_BAD_REQUEST)
         recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
+        with transaction.atomic(), cart.managed():
+            cart.lock_recipes([recipe.id])
+            cart.lock_users([user.id])
+            if model.objects.filter(user=user, recipe=recipe).exists():
+                message = 'Рецепт уже добавлен!'
+                return Response(message, status=status.HTTP_400_BAD_REQUEST)
+            model.objects.create(user=user, recipe=recipe)
+            counters.change(model, [recipe.id], 1)
+            if model is ShoppingCart:
+                cart.add_recipes(user.id, [recipe.id])
         serializer = RecipeShowSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_from(self, model, user, pk):
         obj = model.objects.filter(user=user, recipe__id=pk)
         message = 'Рецепт уже удален!'
-        if obj.exists():
-            obj.delete()
+        with transaction.atomic(), cart.managed():
+            cart.lock_recipes([pk])
+            cart.lock_users([user.id])
+            deleted, _ = obj.delete()
+            if deleted:
+                counters.change(model, [pk], -deleted)
+                if model is ShoppingCart:
+                    cart.remove_recipes(user.id, [pk])
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(message, status=status.HTTP_400_BAD_REQUEST)
 
     @action(
         detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite',
+        url_name='favorite-bulk',
         permission_classes=[IsAuthenticated]
     )
+    def favorite_bulk(self, request):
+        return self.bulk(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk(ShoppingCart, request)
+
+    def bulk(self, model, request):
+        """
+        Добавление или удаление списка рецептов за один запрос.
+        Результат - статус по каждому id: added, exists, deleted
+        или not_found.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(
+            serializer.validated_data['recipes']))
+        if request.method == 'POST':
+            statuses = self.bulk_add(model, request.user, recipe_ids)
+        else:
+            statuses = self.bulk_delete(model, request.user, recipe_ids)
+        return Response({'results': [
+            {'id': recipe_id, 'status': statuses.get(recipe_id, 'not_found')}
+            for recipe_id in recipe_ids
+        ]})
+
+    @staticmethod
+    def bulk_add(model, user, recipe_ids):
+        found = Recipe.objects.only('id').in_bulk(recipe_ids)
+        with transaction.atomic(), cart.managed():
+            cart.lock_recipes(list(found))
+            cart.lock_users([user.id])
+            existing = set(model.objects.filter(
+                user=user, recipe_id__in=found
+            ).values_list('recipe_id', flat=True))
+            added = [
+                recipe_id for recipe_id in found if recipe_id not in existing]
+            if added:
+                model.objects.bulk_create(
+                    (model(user=user, recipe_id=recipe_id)
+                     for recipe_id in added),
+                    ignore_conflicts=True,
+                )
+                counters.change(model, added, 1)
+                if model is ShoppingCart:
+                    cart.add_recipes(user.id, added)
+                invalidate_relations(user.id)
+        statuses = dict.fromkeys(existing, 'exists')
+        statuses.update(dict.fromkeys(added, 'added'))
+        return statuses
+
+    @staticmethod
+    def bulk_delete(model, user, recipe_ids):
+        with transaction.atomic(), cart.managed():
+            cart.lock_recipes(recipe_ids)
+            cart.lock_users([user.id])
+            deleted = list(model.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+            if deleted:
+                model.objects.filter(
+                    user=user, recipe_id__in=deleted).delete()
+                counters.change(model, deleted, -1)
+                if model is ShoppingCart:
+                    cart.remove_recipes(user.id, deleted)
+        return dict.fromkeys(deleted, 'deleted')
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=ShoppingListNegotiation,
+    )
     def download_shopping_cart(self, request):
-        """Выгрузка списка покупок."""
+        """Выгрузка списка покупок в формате txt, csv, json или pdf."""
         user = request.user
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in WRITERS:
+            message = f'Доступные форматы: {", ".join(WRITERS)}'
+            return Response(message, status=status.HTTP_400_BAD_REQUEST)
         if not user.shopping_user.exists():
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        ingredients = IngredientsInRecipe.objects.filter(
-            recipe__shopping_user__user=request.user
-        ).values(
+        ingredients = CartIngredient.objects.filter(user=user).values(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
+            'ingredient__measurement_unit',
+            'amount'
+        )
 
-        shopp_list = shopping_list(ingredients=ingredients, user=user)
+        shopp_list = shopping_list(ingredients=ingredients, user=user,
+                                   file_format=file_format)
         return shopp_list
 
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def shopping_cart_summary(self, request):
+        """Суммы ингредиентов списка покупок из готовой таблицы."""
+        ingredients = CartIngredient.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name').values_list(
+            'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        )
+        return Response({
+            'recipes': len(get_relations(request).cart),
+            'ingredients': [
+                {'id': ingredient_id, 'name': name,
+                 'measurement_unit': measurement_unit, 'amount': amount}
+                for ingredient_id, name, measurement_unit, amount
+                in ingredients
+            ],
+        })
+
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ModelViewSet):
     """Вьюсет для ингредиента."""
     queryset = Ingredient.objects.all()
-    serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = Ingredientfilter
     pagination_class = None
 
+    def get_serializer_class(self):
+        if self.request.method in SAFE_METHODS:
+            return IngredientReadSerializer
+        return IngredientSerializer
+
+    def list(self, request, *args, **kwargs):
+        """Поиск по названию идёт по индексу в памяти, без запроса к БД."""
+        key = (f'ingredients:{get_version(INGREDIENTS_VERSION_KEY)}:'
+               f'{request.query_params.urlencode()}')
+        return conditional_response(
+            request, key, lambda: self.search(request, *args, **kwargs),
+            max_age=settings.CATALOG_CACHE_MAX_AGE,
+        )
 
-class TagViewSet(ModelViewSet):
+    def search(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        limit = (int(limit) if limit and limit.isdigit()
+                 else settings.INGREDIENT_SEARCH_LIMIT)
+        return Response(ingredient_index.search(
+            name, max(1, min(limit, settings.INGREDIENT_SEARCH_MAX_LIMIT))))
+
+
+class TagViewSet(ReplicaReadMixin, ModelViewSet):
     """Вьюсет для тэга."""
     queryset = Tag.objects.all()
-    serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+
+    def get_serializer_class(self):
+        if self.request.method in SAFE_METHODS:
+            return TagReadSerializer
+        return TagSerializer
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request, f'tags:{get_version(TAGS_VERSION_KEY)}',
+            lambda: super(TagViewSet, self).list(request, *args, **kwargs),
+            max_age=settings.CATALOG_CACHE_MAX_AGE,
+        )
+
+
+class MetricsViewSet(ViewSet):
+    """Отчёт о нагрузке по вьюхам для администратора."""
+    permission_classes = (IsAdmin,)
+
+    def list(self, request):
+        return Response(report(collect()))
@@ -0,0 +1,106 @@
+from threading import BoundedSemaphore, Lock
+
+import psycopg2.extras
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from django.utils.asyncio import async_unsafe
+from psycopg2.pool import ThreadedConnectionPool
+
+pools = {}
+pools_lock = Lock()
+
+
+class Pool:
+    """
+    Пул подключений процесса для одного алиаса базы. Если свободных
+    подключений нет, поток ждёт не дольше POOL_TIMEOUT секунд.
+    """
+
+    def __init__(self, size, timeout, conn_params):
+        self.timeout = timeout
+        self.slots = BoundedSemaphore(size)
+        self.connections = ThreadedConnectionPool(0, size, **conn_params)
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError('Нет свободных подключений в пуле')
+        try:
+            return self.connections.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def put(self, connection, close=False):
+        try:
+            self.connections.putconn(connection, close=close)
+        finally:
+            self.slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с проверкой постоянных подключений перед первым
+    использованием в запросе (CONN_HEALTH_CHECKS) и необязательным
+    пулом подключений в процессе (POOL_SIZE, POOL_TIMEOUT).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def pool(self):
+        size = self.settings_dict.get('POOL_SIZE')
+        if not size:
+            return None
+        with pools_lock:
+            if self.alias not in pools:
+                if size < 0:
+                    raise ImproperlyConfigured('POOL_SIZE < 0')
+                pools[self.alias] = Pool(
+                    size, self.settings_dict.get('POOL_TIMEOUT', 10),
+                    self.get_connection_params())
+            return pools[self.alias]
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.get()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        broken = self.errors_occurred and not self.is_usable()
+        with self.wrap_database_errors:
+            pool.put(self.connection, close=broken)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if (self.connection is not None
+                and not self.health_check_done
+                and not self.in_atomic_block
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')):
+            if not self.is_usable():
+                self.errors_occurred = True
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
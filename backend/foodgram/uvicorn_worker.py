@@ -0,0 +1,7 @@
+from uvicorn.workers import UvicornWorker
+
+
+class Worker(UvicornWorker):
+    """Воркер gunicorn для ASGI: Django 3.2 не обрабатывает lifespan."""
+
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, 'lifespan': 'off'}
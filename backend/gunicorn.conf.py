@@ -0,0 +1,18 @@
+import os
+
+# SERVER_MODE=asgi запускает foodgram.asgi на воркерах uvicorn,
+# иначе foodgram.wsgi на синхронных воркерах с потоками.
+mode = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Больше одного воркера - только с общим кешем (см. проверку api.E001).
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+if mode == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'foodgram.uvicorn_worker.Worker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    threads = int(os.getenv('GUNICORN_THREADS', 1))
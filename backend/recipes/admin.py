@@ -35,6 +35,7 @@ class RecipeAdmin(admin.ModelAdmin):
         'total_favorites',
         'pub_date',
     ]
+    readonly_fields = ('favorites_count', 'in_carts_count')
     inlines = [IngredientsInRecipetline]
     search_fields = [
         'name',
@@ -42,9 +43,10 @@ class RecipeAdmin(admin.ModelAdmin):
     ]
     empty_value_display = '-empty-'
 
-    @display(description='Счётчик добавлений в избранное')
+    @display(description='Счётчик добавлений в избранное',
+             ordering='favorites_count')
     def total_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -0,0 +1,202 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import local
+
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from users.models import User
+
+from .models import CartIngredient, IngredientsInRecipe, Recipe, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+incremental = ContextVar('cart_incremental', default=False)
+
+pending = local()
+
+
+@contextmanager
+def managed():
+    """
+    Код внутри сам обновляет счётчики рецептов и суммы списка
+    покупок, сигналы Favorite, ShoppingCart и IngredientsInRecipe
+    их не трогают.
+    """
+    token = incremental.set(True)
+    try:
+        yield
+    finally:
+        incremental.reset(token)
+
+
+def lock_recipes(recipe_ids):
+    """
+    Рецепты блокируются раньше пользователей и по возрастанию id.
+    В этом порядке берут блокировки и изменение состава рецепта
+    (track_recipe), и добавление в избранное и список покупок, которое
+    обновляет счётчик рецепта: при обратном порядке они ждут друг друга.
+    """
+    list(Recipe.objects.select_for_update().filter(
+        id__in=recipe_ids).order_by('id').values_list('id', flat=True))
+
+
+def lock_users(user_ids):
+    """
+    Изменения списков и сумм одного пользователя идут по очереди:
+    иначе параллельные запросы создадут одну строку дважды.
+    """
+    list(User.objects.select_for_update().filter(
+        id__in=user_ids).order_by('id').values_list('id', flat=True))
+
+
+def recipe_amounts(recipe_ids):
+    """Количество каждого ингредиента во всех рецептах вместе."""
+    return Counter(dict(IngredientsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values('ingredient_id').annotate(
+        total=Sum('amount')
+    ).values_list('ingredient_id', 'total')))
+
+
+def expected(user_ids=None):
+    """Суммы ингредиентов, посчитанные по самим спискам покупок."""
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    rows = carts.order_by().values(
+        'user_id', 'recipe__ingredient_list__ingredient_id'
+    ).annotate(total=Sum('recipe__ingredient_list__amount'))
+    return {
+        (row['user_id'], row['recipe__ingredient_list__ingredient_id']):
+        row['total']
+        for row in rows if row['recipe__ingredient_list__ingredient_id']
+    }
+
+
+def stored(user_ids):
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in CartIngredient.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'ingredient_id', 'amount')
+    }
+
+
+@transaction.atomic
+def apply(changes):
+    """
+    Прибавление изменений {(пользователь, ингредиент): разница}.
+    Строки с нулевой суммой удаляются.
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    user_ids = {user_id for user_id, _ in changes}
+    lock_users(user_ids)
+    rows = {
+        (row.user_id, row.ingredient_id): row
+        for row in CartIngredient.objects.filter(
+            user_id__in=user_ids,
+            ingredient_id__in={ingredient_id for _, ingredient_id in changes})
+    }
+    created, changed, removed = [], [], []
+    for (user_id, ingredient_id), delta in changes.items():
+        row = rows.get((user_id, ingredient_id))
+        if row is None:
+            if delta > 0:
+                created.append(CartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=delta))
+        elif row.amount + delta > 0:
+            row.amount += delta
+            changed.append(row)
+        else:
+            removed.append(row.id)
+    if removed:
+        CartIngredient.objects.filter(id__in=removed).delete()
+    if changed:
+        CartIngredient.objects.bulk_update(changed, ('amount',))
+    if created:
+        CartIngredient.objects.bulk_create(created)
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    """Рецепты добавлены в список покупок (sign=-1 - убраны из него)."""
+    apply({
+        (user_id, ingredient_id): sign * amount
+        for ingredient_id, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def remove_recipes(user_id, recipe_ids):
+    add_recipes(user_id, recipe_ids, sign=-1)
+
+
+@contextmanager
+def track_recipe(recipe_id):
+    """
+    Изменение состава рецепта: разница до и после переносится
+    в суммы всех, у кого рецепт в списке покупок. Строка рецепта
+    блокируется: добавление в список покупок тоже обновляет её
+    счётчик и ждёт нового состава.
+    """
+    lock_recipes([recipe_id])
+    before = recipe_amounts([recipe_id])
+    with managed():
+        yield
+    delta = recipe_amounts([recipe_id])
+    delta.subtract(before)
+    delta = {
+        ingredient_id: amount for ingredient_id, amount in delta.items()
+        if amount
+    }
+    if not delta:
+        return
+    apply({
+        (user_id, ingredient_id): amount
+        for user_id in ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True)
+        for ingredient_id, amount in delta.items()
+    })
+
+
+@transaction.atomic
+def rebuild(user_ids):
+    """Пересчёт сумм пользователей по их спискам покупок."""
+    user_ids = set(user_ids)
+    lock_users(user_ids)
+    CartIngredient.objects.filter(user_id__in=user_ids).delete()
+    CartIngredient.objects.bulk_create(
+        CartIngredient(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=amount)
+        for (user_id, ingredient_id), amount in expected(user_ids).items()
+    )
+
+
+def flush_pending():
+    """
+    Ошибка пересчёта не отменяет закоммиченную запись:
+    она логируется, суммы чинит rebuild_cart.
+    """
+    user_ids = getattr(pending, 'ids', None)
+    if not user_ids:
+        return
+    pending.ids = set()
+    try:
+        rebuild(user_ids)
+    except DatabaseError:
+        logger.exception('Ошибка пересчёта списков покупок %s',
+                         sorted(user_ids))
+
+
+def schedule_rebuild(user_ids):
+    """
+    Пересчёт после коммита для изменений в обход managed():
+    админка, каскадное удаление рецептов и ингредиентов.
+    """
+    if not hasattr(pending, 'ids'):
+        pending.ids = set()
+    pending.ids.update(user_ids)
+    transaction.on_commit(flush_pending)
@@ -0,0 +1,16 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Recipe
+
+
+def change(model, recipe_ids, delta):
+    """
+    Изменение счётчика model.counter_field у рецептов на delta.
+    Уменьшение не опускает счётчик ниже нуля, даже если он разошёлся.
+    """
+    field = model.counter_field
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    Recipe.objects.filter(id__in=recipe_ids).update(**{field: value})
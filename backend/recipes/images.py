@@ -0,0 +1,96 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.dispatch import Signal
+from PIL import Image, features
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1280,
+}
+IMAGE_FORMAT, EXTENSION = (
+    ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg'))
+
+variants_ready = Signal()
+
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+
+
+def variant_name(name, variant):
+    """Путь уменьшенной копии изображения рецепта."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'recipes/variants/{stem}_{variant}.{EXTENSION}'
+
+
+def make_variants(recipe_id, name):
+    """
+    Создание уменьшенных копий, которых ещё нет в хранилище. Готовые
+    копии отмечаются у рецепта, если его изображение не успели заменить.
+    """
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA') or IMAGE_FORMAT == 'JPEG':
+        image = image.convert('RGB')
+    for variant, size in VARIANTS.items():
+        target = variant_name(name, variant)
+        if default_storage.exists(target):
+            continue
+        copy = image.copy()
+        copy.thumbnail((size, size))
+        buffer = BytesIO()
+        copy.save(buffer, IMAGE_FORMAT, quality=80)
+        default_storage.save(target, ContentFile(buffer.getvalue()))
+    marked = Recipe.objects.filter(id=recipe_id, image=name).exclude(
+        image_variants=list(VARIANTS)).update(image_variants=list(VARIANTS))
+    if marked:
+        variants_ready.send(sender=Recipe, recipe_id=recipe_id)
+
+
+def log_errors(future):
+    if future.exception():
+        logger.error('Ошибка обработки изображения',
+                     exc_info=future.exception())
+
+
+def run_job(recipe_id, name):
+    """
+    Задача пула. Подключения к БД у потоков свои, поэтому устаревшие
+    закрываются до и после неё, как в async_views.call_in_thread.
+    """
+    close_old_connections()
+    try:
+        make_variants(recipe_id, name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(recipe_id, name):
+    """Обработка изображения в фоновом пуле, вне потока запроса."""
+    executor.submit(run_job, recipe_id, name).add_done_callback(log_errors)
+
+
+def variant_urls(recipe):
+    """
+    Ссылки на уменьшенные копии по отметкам рецепта, без обращений
+    к хранилищу. Пока копия не готова, отдаётся ссылка на оригинал.
+    """
+    image = recipe.image
+    if not image:
+        return {}
+    return {
+        variant: (default_storage.url(variant_name(image.name, variant))
+                  if variant in recipe.image_variants else image.url)
+        for variant in VARIANTS
+    }
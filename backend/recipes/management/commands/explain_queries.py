@@ -0,0 +1,103 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart)
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Проверка планов запросов горячих фильтров на текущих '
+            'данных: каждый должен использовать индекс, а не Seq Scan.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--disable-seqscan', action='store_true',
+            help='Запретить Seq Scan: проверить только, что индекс '
+                 'применим, например на пустой базе')
+
+    @staticmethod
+    def queries(user_id=1, author_id=1, recipe_id=1, slug='breakfast',
+                prefix='абр', search='борщ'):
+        """
+        Запросы в том виде, в котором их строят фильтры и вьюсеты,
+        и таблицы, которые они должны читать по индексу. Справочник
+        тегов мал, его полный просмотр планировщик выбирает законно.
+        """
+        recipes = Recipe._meta.db_table
+        return {
+            'Recipe tags + author': (
+                Recipe.objects.filter(
+                    tags__slug=slug, author_id=author_id
+                ).order_by('-pub_date')[:6],
+                (recipes, Recipe.tags.through._meta.db_table),
+            ),
+            'Recipe is_favorited': (
+                Recipe.objects.filter(favorites__user=user_id)[:6],
+                (recipes, Favorite._meta.db_table),
+            ),
+            'Recipe is_in_shopping_cart': (
+                Recipe.objects.filter(shopping_user__user=user_id)[:6],
+                (recipes, ShoppingCart._meta.db_table),
+            ),
+            'Recipe search': (
+                Recipe.objects.filter(
+                    Q(search_vector=SearchQuery(search, config='russian'))
+                    | Q(name__trigram_similar=search)
+                )[:6],
+                (recipes,),
+            ),
+            'Ingredient name prefix': (
+                Ingredient.objects.filter(name__startswith=prefix),
+                (Ingredient._meta.db_table,),
+            ),
+            'Favorite user + recipe': (
+                Favorite.objects.filter(user_id=user_id, recipe_id=recipe_id),
+                (Favorite._meta.db_table,),
+            ),
+            'ShoppingCart user + recipe': (
+                ShoppingCart.objects.filter(user_id=user_id,
+                                            recipe_id=recipe_id),
+                (ShoppingCart._meta.db_table,),
+            ),
+            'Follow user + author': (
+                Follow.objects.filter(user_id=user_id, author_id=author_id),
+                (Follow._meta.db_table,),
+            ),
+            'Shopping list ingredients': (
+                IngredientsInRecipe.objects.filter(
+                    recipe__shopping_user__user_id=user_id),
+                (IngredientsInRecipe._meta.db_table, recipes,
+                 ShoppingCart._meta.db_table),
+            ),
+        }
+
+    @staticmethod
+    def seq_scans(plan, tables):
+        """
+        Таблицы из списка, которые план читает целиком. Граница слова
+        отличает recipes_recipe от recipes_recipe_tags.
+        """
+        return [table for table in tables if re.search(
+            rf'Seq Scan on {re.escape(table)}\b', plan)]
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов требует PostgreSQL.')
+        failed = []
+        with transaction.atomic():
+            if options['disable_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, (queryset, tables) in self.queries().items():
+                plan = queryset.explain()
+                if self.seq_scans(plan, tables):
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f'{name}:\n{plan}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+        if failed:
+            raise CommandError(f'Seq Scan в запросах: {", ".join(failed)}')
@@ -1,20 +1,94 @@
 import csv
+import json
+from itertools import islice
+from time import monotonic
 
-from django.core.management.base import BaseCommand
+from api.cache import INGREDIENTS_VERSION_KEY, bump_version
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
 
 class Command(BaseCommand):
+    help = 'Загрузка ингредиентов из csv или json файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='./data/ingredients.csv',
+            help='Путь к файлу ingredients.csv или ingredients.json',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной вставке',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Прочитать файл без записи в базу данных',
+        )
 
     def handle(self, *args, **options):
-        self.loading_ingredients()
+        start = monotonic()
+        read, created = self.loading_ingredients(
+            options['path'], options['batch_size'], options['dry_run'])
+        elapsed = monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {read}, добавлено: {created}, '
+            f'{read / elapsed if elapsed else read:.0f} строк/с'
+        ))
 
-    def loading_ingredients(self, file='ingredients.csv'):
-        file_path = f'./data/{file}'
+    @staticmethod
+    def read_rows(file_path):
+        """Пары (название, единица измерения) из файла."""
         with open(file_path, newline='', encoding='utf-8') as f:
-            read = csv.reader(f)
-            for i in read:
-                Ingredient.objects.update_or_create(
-                    name=i[0],
-                    measurement_unit=i[1]
-                )
+            if file_path.endswith('.json'):
+                for row in json.load(f):
+                    yield row['name'], row['measurement_unit']
+            else:
+                for row in csv.reader(f):
+                    yield row[0], row[1]
+
+    @staticmethod
+    def batches(rows, size):
+        while True:
+            batch = list(islice(rows, size))
+            if not batch:
+                return
+            yield batch
+
+    def loading_ingredients(self, file_path, batch_size, dry_run):
+        """
+        Загрузка пачками в одной транзакции. Дубликаты по
+        unique_ingredient отсекаются в памяти до вставки.
+        """
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        try:
+            rows = self.read_rows(file_path)
+            seen = set(Ingredient.objects.values_list(
+                'name', 'measurement_unit'))
+            read = created = 0
+            with transaction.atomic():
+                for batch in self.batches(rows, batch_size):
+                    read += len(batch)
+                    new = []
+                    for row in batch:
+                        if row not in seen:
+                            seen.add(row)
+                            new.append(Ingredient(
+                                name=row[0], measurement_unit=row[1]))
+                    created += len(new)
+                    if not dry_run:
+                        Ingredient.objects.bulk_create(
+                            new, ignore_conflicts=True)
+                    self.stdout.write(
+                        f'Обработано строк: {read}', ending='\r')
+        except (OSError, KeyError, IndexError, ValueError) as error:
+            raise CommandError(f'Ошибка чтения {file_path}: {error}')
+        self.stdout.write('')
+        if created and not dry_run:
+            bump_version(INGREDIENTS_VERSION_KEY)
+        return read, created
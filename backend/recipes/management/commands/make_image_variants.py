@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from recipes.images import VARIANTS, make_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Создание уменьшенных копий изображений рецептов, '
+            'у которых они не отмечены готовыми.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image_variants=list(VARIANTS)).order_by('id').values_list(
+            'id', 'image')
+        done = failed = 0
+        for recipe_id, name in recipes.iterator():
+            done += 1
+            try:
+                make_variants(recipe_id, name)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe_id}: {error}')
+        self.stdout.write(
+            f'Обработано рецептов: {done}, ошибок: {failed}')
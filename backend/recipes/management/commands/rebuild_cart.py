@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from recipes.cart import expected, rebuild, stored
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сверка сумм ингредиентов списков покупок со списками '
+            'и пересчёт разошедшихся.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--check', action='store_true',
+                            help='Только показать расхождения')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = list(User.objects.filter(
+            Q(shopping_user__isnull=False) | Q(cart_ingredients__isnull=False)
+        ).distinct().order_by('id').values_list('id', flat=True))
+        broken = []
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            actual = stored(batch)
+            wanted = expected(batch)
+            broken.extend(sorted({
+                user_id for user_id, _ in actual.keys() ^ wanted.keys()
+            } | {
+                user_id for (user_id, ingredient_id), amount in wanted.items()
+                if actual.get((user_id, ingredient_id), amount) != amount
+            }))
+        if broken and not options['check']:
+            for start in range(0, len(broken), batch_size):
+                rebuild(broken[start:start + batch_size])
+        self.stdout.write(
+            f'Проверено пользователей: {len(user_ids)}, '
+            f'расхождения: {len(broken)}')
+        if options['check'] and broken:
+            self.stdout.write(f'Пользователи: {broken}')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного и списка покупок у рецептов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model in (Favorite, ShoppingCart):
+                fixed = self.recount(model)
+                self.stdout.write(
+                    f'{model.counter_field}: исправлено рецептов {fixed}')
+
+    @staticmethod
+    def recount(model):
+        """Обновление только тех рецептов, где счётчик разошёлся."""
+        field = model.counter_field
+        counts = model.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(total=Count('pk'))
+        actual = Coalesce(Subquery(counts.values('total')), 0)
+        return Recipe.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).update(**{field: actual})
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from users.models import User
@@ -55,6 +56,10 @@ class Ingredient(models.Model):
                 name='unique_ingredient'
             ),
         )
+        indexes = (
+            models.Index(fields=('name',), name='ingredient_name_like_idx',
+                         opclasses=('varchar_pattern_ops',)),
+        )
 
     def __str__(self):
         return f'{self.name} - {self.measurement_unit}'
@@ -92,6 +97,11 @@ class Recipe(models.Model):
         help_text='Изображение блюда',
         upload_to='recipes/',
     )
+    image_variants = models.JSONField(
+        verbose_name='Готовые копии изображения',
+        default=list,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
         help_text='Описание рецепта',
@@ -107,15 +117,76 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date',), name='recipe_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date'),
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=('-favorites_count', '-pub_date'),
+                         name='recipe_popular_idx'),
+            models.Index(fields=('cooking_time', '-pub_date'),
+                         name='recipe_cooking_time_idx'),
+        )
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        if 'image' in field_names:
+            recipe._saved_image = values[field_names.index('image')]
+        return recipe
+
+    def image_replaced(self):
+        """Изображение новое или отличается от сохранённого в базе."""
+        return self.image.name != getattr(self, '_saved_image', None)
+
+
+class RecipeDocument(models.Model):
+    """
+    Готовое представление рецепта для чтения без флагов пользователя.
+    Пересобирается при изменении рецепта, тегов, ингредиентов и автора.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document',
+        verbose_name='Рецепт'
+    )
+    data = models.JSONField(verbose_name='Документ')
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+    def __str__(self):
+        return f'Документ рецепта {self.recipe_id}'
+
 
 class IngredientsInRecipe(models.Model):
     """Модель количества ингредиентов в рецепте."""
@@ -151,6 +222,8 @@ class IngredientsInRecipe(models.Model):
 
 class Favorite(models.Model):
     """Модель избранных рецептов."""
+    counter_field = 'favorites_count'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -180,6 +253,8 @@ class Favorite(models.Model):
 
 class ShoppingCart(models.Model):
     """Модель списка покупок."""
+    counter_field = 'in_carts_count'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -205,3 +280,73 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" покупки'
+
+
+class CartIngredient(models.Model):
+    """
+    Сумма ингредиента по всем рецептам в списке покупок пользователя.
+    Обновляется вместе со списком покупок и составом рецептов.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_cart_ingredient',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Рецепт в ленте подписок пользователя. Записи создаются при
+    публикации рецепта для всех подписчиков автора.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_entry',
+            )
+        ]
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='timeline_user_pub_date_idx'),
+        )
+
+    def __str__(self):
+        return f'Рецепт {self.recipe_id} в ленте {self.user}'
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cart, counters
+from .images import schedule_variants
+from .models import Favorite, IngredientsInRecipe, Recipe, ShoppingCart
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_replaced(sender, instance, **kwargs):
+    """Копии прежнего изображения к новому не относятся."""
+    if instance.image_replaced():
+        instance.image_variants = []
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    """
+    Уменьшенные копии создаются после коммита и только для нового
+    изображения: сохранение остальных полей их не трогает.
+    """
+    if instance.image and instance.image_replaced():
+        recipe_id, name = instance.id, instance.image.name
+        transaction.on_commit(lambda: schedule_variants(recipe_id, name))
+    instance._saved_image = instance.image.name
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    """Список покупок изменён в обход API."""
+    if not cart.incremental.get():
+        cart.schedule_rebuild([instance.user_id])
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def cart_recipe_changed(sender, instance, **kwargs):
+    """Состав рецепта изменён в обход API."""
+    if not cart.incremental.get():
+        cart.schedule_rebuild(ShoppingCart.objects.filter(
+            recipe_id=instance.recipe_id).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_relation_created(sender, instance, created, **kwargs):
+    """Добавление в избранное или список покупок в обход API."""
+    if created and not cart.incremental.get():
+        counters.change(sender, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_relation_deleted(sender, instance, **kwargs):
+    """Удаление из админки или каскадом вместе с пользователем."""
+    if not cart.incremental.get():
+        counters.change(sender, [instance.recipe_id], -1)